@@ -19,16 +19,24 @@ gi.require_version('Notify', '0.7')
 
 import os
 import time
+import threading
 import socket
+import traceback
 import xml.etree.ElementTree as ElementTree
-from time import sleep
 from os.path import expanduser
-from _thread import start_new_thread
 from gi.repository import GLib, Gtk, GObject, Gedit, Gio, Notify
 from AddiksDBGP.helpers import *
 from AddiksDBGP.ProfileManager import ProfileManager
 from AddiksDBGP.DebugSession import DebugSession
 from AddiksDBGP.GladeHandler import GladeHandler
+from AddiksDBGP.SocketLoop import SocketLoop
+from AddiksDBGP.PortListener import PortListener
+from AddiksDBGP.EngineCapabilityCache import EngineCapabilityCache
+from AddiksDBGP.SnapshotFile import SnapshotFile
+from AddiksDBGP.SnapshotViewer import SnapshotViewer
+from AddiksDBGP.SessionAdmission import SessionAdmission
+from AddiksDBGP.SessionWindowPool import SessionWindowPool
+from AddiksDBGP.UiResources import load_ui_component
 
 ACTIONS = [
     ['DebugAction',                "Debugging",                           "",    None],
@@ -36,6 +44,8 @@ ACTIONS = [
     ['StopListeningAction',        "Stop listening for debug-sessions",   "",    "stop_listening"],
     ['ManageProfilesAction',       "Manage profiles",                     "",    "show_profile_manager"],
     ['ManageBreakpointsAction',    "Manage breakpoints",                  "",    "show_breakpoints"],
+    ['OpenSnapshotsAction',        "Open recorded snapshots",             "",    "show_snapshots"],
+    ['SessionCountersAction',      "Session counters",                    "",    "show_session_counters"],
     ['SessionStopAction',          "Stop session",                        "",    "session_stop"],
     ['SessionStepIntoAction',      "Step into",                           "F5",  "session_step_into"],
     ['SessionStepOverAction',      "Step over",                           "F6",  "session_step_over"],
@@ -51,11 +61,21 @@ class AddiksDBGPApp(GObject.Object, Gedit.AppActivatable):
         GObject.Object.__init__(self)
         Notify.init("gedit_addiks_xdebug")
         self._debug_profile_manager = None
-        self._listening_sockets = []
+        self._engine_capability_cache = None
+        self._port_listener = None
         self._active_sessions = []
         self._breakpoints = None
         self._glade_builder = None
         self._glade_handler = None
+        self._socket_loop = None
+        self._logpoints_log_lock = threading.Lock()
+        self._snapshot_files = {}
+        self._snapshot_files_lock = threading.Lock()
+        self._snapshot_viewers = {}
+        self._session_admission = SessionAdmission(self)
+        self._session_window_pool = SessionWindowPool(self)
+        self._glade_components = set()
+        self._is_session_counters_refreshing = False
 
     def do_activate(self):
         AddiksDBGPApp.__instance = self
@@ -84,6 +104,9 @@ class AddiksDBGPApp(GObject.Object, Gedit.AppActivatable):
 
     def do_deactivate(self):
         AddiksDBGPApp.__instance = None
+        if self._socket_loop != None:
+            self._socket_loop.stop()
+            self._socket_loop = None
 
     def do_update_state(self):
         pass
@@ -126,20 +149,20 @@ class AddiksDBGPApp(GObject.Object, Gedit.AppActivatable):
         textIter.set_line_offset(0)
         view.scroll_to_iter(textIter, 0.3, False, 0.0, 0.5)
 
-        start_new_thread(self.delayed_present, (window, ))
+        GLib.timeout_add(10, self.delayed_present, window)
 
         return tab
 
     def delayed_present(self, window):
-        sleep(0.01)
-        GLib.idle_add(window.present)
+        window.present()
+        return False
 
     def show_profile_manager(self, foo=None, bar=None):
         self.get_profile_manager().show()
 
     def show_breakpoints(self, foo=None, bar=None):
 
-        builder = self.getGladeBuilder()
+        builder = self.getGladeBuilder("breakpoints")
 
         windowBreakpoints = builder.get_object("windowBreakpoints")
         liststoreBreakpoints = builder.get_object("liststoreBreakpoints")
@@ -157,11 +180,49 @@ class AddiksDBGPApp(GObject.Object, Gedit.AppActivatable):
 
         windowBreakpoints.show_all()
 
+    def show_snapshots(self, foo=None, bar=None):
+        dialog = Gtk.FileChooserDialog(
+            "Open recorded snapshots",
+            self.get_all_windows()[0].window,
+            Gtk.FileChooserAction.OPEN,
+            (Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL, Gtk.STOCK_OPEN, Gtk.ResponseType.OK)
+        )
+        snapshotsFilter = Gtk.FileFilter()
+        snapshotsFilter.set_name("Snapshots")
+        snapshotsFilter.add_pattern("*.snapshots")
+        dialog.add_filter(snapshotsFilter)
+        snapshotsDir = self.__get_snapshots_dir()
+        if os.path.exists(snapshotsDir):
+            dialog.set_current_folder(snapshotsDir)
+        response = dialog.run()
+        filePath = dialog.get_filename()
+        dialog.destroy()
+
+        if response == Gtk.ResponseType.OK and filePath != None:
+            if filePath not in self._snapshot_viewers:
+                self._snapshot_viewers[filePath] = SnapshotViewer(self, SnapshotFile(filePath))
+            self._snapshot_viewers[filePath].show()
+
+    def get_snapshot_file(self, ideKey):
+        # one instance per file, all sessions of the same idekey record into it
+        with self._snapshot_files_lock:
+            if ideKey not in self._snapshot_files:
+                self._snapshot_files[ideKey] = SnapshotFile(self.__get_snapshots_dir() + "/" + ideKey + ".snapshots")
+            return self._snapshot_files[ideKey]
+
+    def __get_snapshots_dir(self):
+        return self.get_data_dir() + "/snapshots"
+
     def get_profile_manager(self):
         if self._debug_profile_manager == None:
             self._debug_profile_manager = ProfileManager(self)
         return self._debug_profile_manager
 
+    def get_engine_capability_cache(self):
+        if self._engine_capability_cache == None:
+            self._engine_capability_cache = EngineCapabilityCache(self)
+        return self._engine_capability_cache
+
     def __show_dialog(self, message):
         GLib.idle_add(self.__do_show_dialog, message)
 
@@ -224,6 +285,16 @@ class AddiksDBGPApp(GObject.Object, Gedit.AppActivatable):
             self.views.remove(view)
 
 
+    ### SOCKET LOOP
+
+    def get_socket_loop(self):
+        if self._socket_loop == None:
+            self._socket_loop = SocketLoop()
+        return self._socket_loop
+
+    def run_in_worker(self, callback, *arguments):
+        return self.get_socket_loop().run_in_worker(callback, *arguments)
+
     ### DBGP PORT LISTEN
 
     def _connectDbgp(self, host, port, ideKey):
@@ -248,52 +319,86 @@ class AddiksDBGPApp(GObject.Object, Gedit.AppActivatable):
                     profile['dbgp_port'],
                     profile['dbgp_ide_key'],
                 ])
-        openedSockets = []
+        portListener = self.get_port_listener()
         port = None
         try:
             for port in set(ports):
-                listenSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self._listening_sockets.append(listenSocket)
-                listenSocket.bind(("0.0.0.0", int(port)))
-                openedSockets.append(listenSocket)
-                start_new_thread(self._listenPort, (listenSocket, ))
+                portListener.listen(port)
 
             for dbgpHost, dbgpPort, ideKey in dbgpProxies:
-                start_new_thread(self.dbgp_proxy_start, (dbgpHost, dbgpPort, ideKey, ports[0], ))
+                self.run_in_worker(self.dbgp_proxy_start, dbgpHost, dbgpPort, ideKey, ports[0])
 
             for view in self.get_all_views():
                 view.show_breakpoint_gutter()
 
+            GLib.idle_add(self._session_window_pool.prewarm)
+
             for window in self.get_all_windows():
                 window.set_listen_menu_set_started()
 
         except OSError as exception:
-            for listenSocket in openedSockets:
-                listenSocket.close()
+            portListener.close()
             self.__show_dialog("Cannot open port, the port "+str(int(port))+" is already in use")
 
     def does_listen(self):
-        return len(self._listening_sockets)>0
+        return self._port_listener != None and self._port_listener.is_listening()
 
-    def _listenPort(self, listenSocket):
-        listenSocket.listen(5)
-        listenSocket.settimeout(0.5)
-        while listenSocket in self._listening_sockets:
-            try:
-                (clientSocket, address) = listenSocket.accept()
-                start_new_thread(self._acceptClient, (clientSocket, address, ))
-            except (socket.timeout, OSError):
-                pass
+    def get_port_listener(self):
+        if self._port_listener == None:
+            self._port_listener = PortListener(self.get_socket_loop(), self._onClientAccepted)
+        return self._port_listener
+
+    def _onClientAccepted(self, clientSocket, address):
+        # called on the socket-loop, the session handshake blocks and thus runs on a worker
+        self.run_in_worker(self._acceptClient, clientSocket, address)
 
     def _acceptClient(self, clientSocket, address=None):
         session = DebugSession(self, clientSocket)
+        try:
+            profileName, profile = session.read_init()
+        except BrokenPipeError:
+            return
+        self._session_admission.admit(session, profileName, profile)
+
+    def attach_session(self, session):
         self._active_sessions.append(session)
-        session.init()
+        try:
+            session.init()
+        except Exception:
+            # a session that could not start must not keep the attach-slot of its profile
+            traceback.print_exc()
+            session.close_connection()
+            self.remove_session(session)
+
+    def get_session_window_pool(self):
+        return self._session_window_pool
+
+    def get_session_admission(self):
+        return self._session_admission
+
+    def show_session_counters(self, foo=None, bar=None):
+        builder = self.getGladeBuilder("session_counters")
+        window = builder.get_object("windowSessionCounters")
+        window.show_all()
+        self.__refresh_session_counters()
+        if not self._is_session_counters_refreshing:
+            self._is_session_counters_refreshing = True
+            GLib.timeout_add_seconds(1, self.__refresh_session_counters)
+
+    def __refresh_session_counters(self):
+        window = self.getGladeBuilder("session_counters").get_object("windowSessionCounters")
+        if not window.get_visible():
+            self._is_session_counters_refreshing = False
+            return False
+        self.getGladeHandler().updateSessionCounters(
+            self._session_admission.get_statistics(),
+            self._session_window_pool.get_statistics()
+        )
+        return True
 
     def stop_listening(self, foo=None, bar=None):
-        for socket in self._listening_sockets:
-            socket.close()
-        self._listening_sockets = []
+        if self._port_listener != None:
+            self._port_listener.close()
 
         for view in self.get_all_views():
             view.hide_breakpoint_gutter()
@@ -370,6 +475,7 @@ class AddiksDBGPApp(GObject.Object, Gedit.AppActivatable):
     def remove_session(self, session):
         if session in self._active_sessions:
             self._active_sessions.remove(session)
+            self._session_admission.release(session)
 
     def _runBrowser(self, url, ideKey):
 
@@ -398,32 +504,37 @@ class AddiksDBGPApp(GObject.Object, Gedit.AppActivatable):
     def session_run(self, foo=None, bar=None):
         sessions = self.get_active_sessions()
         if len(sessions) > 0:
-            sessions[0].run()
+            sessions[0].dispatch("run")
 
     def session_run_to_end(self, foo=None, bar=None):
         sessions = self.get_active_sessions()
         if len(sessions) > 0:
-            sessions[0].run(True)
+            sessions[0].dispatch("run", True)
+
+    def session_run_to_cursor(self, filePath, line):
+        sessions = self.get_active_sessions()
+        if len(sessions) > 0:
+            sessions[0].dispatch("run_to", filePath, line)
 
     def session_step_into(self, foo=None, bar=None):
         sessions = self.get_active_sessions()
         if len(sessions) > 0:
-            sessions[0].step_into()
+            sessions[0].dispatch("step_into")
 
     def session_step_over(self, foo=None, bar=None):
         sessions = self.get_active_sessions()
         if len(sessions) > 0:
-            sessions[0].step_over()
+            sessions[0].dispatch("step_over")
 
     def session_step_out(self, foo=None, bar=None):
         sessions = self.get_active_sessions()
         if len(sessions) > 0:
-            sessions[0].step_out()
+            sessions[0].dispatch("step_out")
 
     def session_stop(self, foo=None, bar=None):
         sessions = self.get_active_sessions()
         if len(sessions) > 0:
-            sessions[0].stop()
+            sessions[0].dispatch("stop")
 
     ### BREAKPOINTS
 
@@ -462,43 +573,88 @@ class AddiksDBGPApp(GObject.Object, Gedit.AppActivatable):
         if line in breakpoints[filePath]:
             del breakpoints[filePath][line]
             for session in self.get_active_sessions():
-                start_new_thread(session.remove_breakpoint_by_file_line, (filePath, line, ))
+                self.run_in_worker(session.remove_breakpoint_by_file_line, filePath, line)
         else:
             breakpoints[filePath][line] = None
             for session in self.get_active_sessions():
-                start_new_thread(session.set_breakpoint, ({
+                self.run_in_worker(session.set_breakpoint, {
                     'filename':   filePath,
                     'lineno':     line,
                     'expression': None
-                }, ))
+                })
         self._save_breakpoints()
 
     def set_breakpoint_condition(self, filePath, line, condition=None):
-        breakpoints = self.get_all_breakpoints()
-        if filePath not in breakpoints:
-            breakpoints[filePath] = {}
-        breakpoints[filePath][line] = condition
+        options = self.get_breakpoint_options(filePath, line)
+        options['condition'] = condition
+        self.__store_breakpoint_options(filePath, line, options)
         for session in self.get_active_sessions():
-            start_new_thread(session.set_breakpoint, ({
+            self.run_in_worker(session.set_breakpoint, {
                 'filename':   filePath,
                 'lineno':     line,
                 'expression': condition
-            }, ))
+            })
         self._save_breakpoints()
 
     def get_breakpoint_condition(self, filePath, line, condition=None):
-        breakpoints = self.get_all_breakpoints()
-        condition = None
-        if filePath in breakpoints and line in breakpoints[filePath]:
-            condition = breakpoints[filePath][line]
-        return condition
+        return self.get_breakpoint_options(filePath, line)['condition']
 
     def breakpoint_has_condition(self, filePath, line):
+        return self.get_breakpoint_condition(filePath, line) != None
+
+    def set_breakpoint_log(self, filePath, line, expressions=[]):
+        # A breakpoint with log-expressions (a logpoint) does not stop the session, the expressions
+        # get logged and the session runs on.
         breakpoints = self.get_all_breakpoints()
-        hasCondition = False
+        isNewBreakpoint = filePath not in breakpoints or line not in breakpoints[filePath]
+        options = self.get_breakpoint_options(filePath, line)
+        options['log'] = list(expressions)
+        self.__store_breakpoint_options(filePath, line, options)
+        if isNewBreakpoint:
+            for session in self.get_active_sessions():
+                self.run_in_worker(session.set_breakpoint, {
+                    'filename':   filePath,
+                    'lineno':     line,
+                    'expression': options['condition']
+                })
+        self._save_breakpoints()
+
+    def get_breakpoint_log(self, filePath, line):
+        return self.get_breakpoint_options(filePath, line)['log']
+
+    def breakpoint_has_log(self, filePath, line):
+        return len(self.get_breakpoint_log(filePath, line)) > 0
+
+    def get_breakpoint_options(self, filePath, line):
+        # A breakpoint is stored as None, as its condition or (if it has log-expressions) as a dict.
+        breakpoints = self.get_all_breakpoints()
+        storedOptions = None
         if filePath in breakpoints and line in breakpoints[filePath]:
-            hasCondition = breakpoints[filePath][line] != None
-        return hasCondition
+            storedOptions = breakpoints[filePath][line]
+        options = {'condition': None, 'log': []}
+        if type(storedOptions) == dict:
+            options.update(storedOptions)
+        else:
+            options['condition'] = storedOptions
+        return options
+
+    def __store_breakpoint_options(self, filePath, line, options):
+        breakpoints = self.get_all_breakpoints()
+        if filePath not in breakpoints:
+            breakpoints[filePath] = {}
+        if len(options['log']) > 0:
+            breakpoints[filePath][line] = options
+        else:
+            breakpoints[filePath][line] = options['condition']
+
+    def append_logpoint_log(self, line):
+        # called from the worker-threads of the sessions
+        with self._logpoints_log_lock:
+            dataDir = self.get_data_dir()
+            if not os.path.exists(dataDir):
+                os.makedirs(dataDir)
+            with open(dataDir + "/logpoints.log", "a", encoding="utf-8") as logFile:
+                logFile.write(line + "\n")
 
     ### PATHS
 
@@ -514,13 +670,16 @@ class AddiksDBGPApp(GObject.Object, Gedit.AppActivatable):
             self.__initGlade()
         return self._glade_handler
 
-    def getGladeBuilder(self):
+    def getGladeBuilder(self, component=None):
+        # the windows of the app are only loaded once they are needed
         if self._glade_builder == None:
             self.__initGlade()
+        if component != None and component not in self._glade_components:
+            self._glade_components.add(component)
+            load_ui_component(self._glade_builder, component)
+            self._glade_builder.connect_signals(self._glade_handler) # only connects the new objects
         return self._glade_builder
 
     def __initGlade(self):
         self._glade_builder = Gtk.Builder()
-        self._glade_builder.add_from_file(os.path.dirname(__file__)+"/../addiks-dbgp.glade")
         self._glade_handler = GladeHandler(self, self._glade_builder)
-        self._glade_builder.connect_signals(self._glade_handler)
@@ -27,6 +27,7 @@ class AddiksDBGPView(GObject.Object, Gedit.ViewActivatable):
         self._gutter_renderer = None
         self._gutter_breakpoint_icons = {}
         self._gutter_empty_pixbuf = None
+        self._populate_popup_handler = None
         self.__drawArea = None
 
     def do_activate(self):
@@ -52,9 +53,31 @@ class AddiksDBGPView(GObject.Object, Gedit.ViewActivatable):
                 self.__drawArea.connect("size-allocate", self.on_drawingarea_size_allocate)
                 self.__drawArea.connect_after("draw", self.on_drawingarea_draw)
 
+        self._populate_popup_handler = self.view.connect("populate-popup", self.on_populate_popup)
+
         if AddiksDBGPApp.get().does_listen():
             self.show_breakpoint_gutter()
 
+    def on_populate_popup(self, view, popup):
+        document = self.view.get_buffer()
+        if type(popup) is Gtk.Menu and document.get_location() != None:
+            if len(AddiksDBGPApp.get().get_active_sessions()) > 0:
+                filePath = document.get_location().get_path()
+                line = document.get_iter_at_mark(document.get_insert()).get_line()+1
+
+                seperator = Gtk.SeparatorMenuItem()
+                seperator.show()
+                popup.append(seperator)
+
+                menuItem = Gtk.MenuItem()
+                menuItem.set_label("Run to cursor")
+                menuItem.connect("activate", self.on_run_to_cursor, filePath, line)
+                menuItem.show()
+                popup.append(menuItem)
+
+    def on_run_to_cursor(self, menuItem, filePath, line):
+        AddiksDBGPApp.get().session_run_to_cursor(filePath, line)
+
     def on_drawingarea_size_allocate(self, widget, allocationRect, data=None):
         widget.queue_draw()
 
@@ -84,6 +107,10 @@ class AddiksDBGPView(GObject.Object, Gedit.ViewActivatable):
     def do_deactivate(self):
         AddiksDBGPApp.get().unregister_view(self)
 
+        if self._populate_popup_handler != None:
+            self.view.disconnect(self._populate_popup_handler)
+            self._populate_popup_handler = None
+
         if AddiksDBGPApp.get().does_listen():
             self.hide_breakpoint_gutter()
 
@@ -135,7 +162,7 @@ class AddiksDBGPView(GObject.Object, Gedit.ViewActivatable):
                 line = textIter.get_line()+1 
 
                 if button == 3:
-                    builder = AddiksDBGPApp.get().getGladeBuilder()
+                    builder = AddiksDBGPApp.get().getGladeBuilder("breakpoints")
                     menuBreakpoints = builder.get_object("menuBreakpoints")
                     menuBreakpoints.popup(None, None, None, None, button, event.time)
                     menuBreakpoints.addiks_window = None
@@ -155,7 +182,8 @@ class AddiksDBGPView(GObject.Object, Gedit.ViewActivatable):
             filePath = document.get_location().get_path()
             line = textIterStart.get_line()+1
             if line in AddiksDBGPApp.get().get_breakpoints(filePath):
-                hasCondition = AddiksDBGPApp.get().breakpoint_has_condition(filePath, line)
+                plugin = AddiksDBGPApp.get()
+                hasCondition = plugin.breakpoint_has_condition(filePath, line) or plugin.breakpoint_has_log(filePath, line)
                 renderer.set_gicon(self._get_breakpoint_icon(hasCondition))
             else:
                 renderer.set_pixbuf(self._get_empty_pixbuf())
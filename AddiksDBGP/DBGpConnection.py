@@ -0,0 +1,159 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import base64
+import threading
+from collections import deque
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from AddiksDBGP.PacketReader import PacketReader
+
+# One DBGp connection to a debugging engine.
+#
+# Commands can be sent from any thread, every command gets its own transaction-id and a Future that
+# is resolved by the socket-loop as soon as the response with that transaction-id arrives. This
+# allows many commands to be in flight on the same socket at once. The init-packet and all
+# asynchronous packets (notify, stream) are not bound to a transaction and are delivered separately.
+class DBGpConnection:
+
+    def __init__(self, clientSocket, socketLoop):
+        self._socket = clientSocket
+        self._socket_loop = socketLoop
+        self._packet_reader = PacketReader(clientSocket)
+        self._transaction_id_counter = 1
+        self._round_trip_counter = 0 # writes, every batch is answered within one round-trip
+        self._pending_transactions = {}
+        self._lock = threading.Lock()
+        self._init_future = Future()
+        self._notifications = deque(maxlen=256)
+        self._notify_handler = None
+        self._is_closed = False
+        socketLoop.add_reader(clientSocket, self.__on_readable)
+
+    def get_init_packet(self, timeout=None):
+        # A client that connects but never sends its init-packet is dropped after 'timeout' seconds.
+        try:
+            return self._init_future.result(timeout)
+        except FutureTimeoutError:
+            self.close()
+            raise BrokenPipeError("No init-packet within " + str(timeout) + " seconds")
+
+    def get_notifications(self):
+        return list(self._notifications)
+
+    def set_notify_handler(self, handler):
+        # The handler is called from the socket-loop with every notify/stream packet, it must not block.
+        self._notify_handler = handler
+
+    def send_command(self, command, arguments=[], data=None):
+        return self.send_commands([(command, arguments, data)])[0]
+
+    def send_commands(self, commands):
+        # Sends a batch of (command, arguments, data) tuples with one write. The engine processes
+        # them in order, all responses can then be collected with one network round-trip.
+        futures = []
+        packets = []
+        with self._lock:
+            if self._is_closed:
+                raise BrokenPipeError("Connection was closed")
+            firstTransactionId = self._transaction_id_counter
+            for command, arguments, data in commands:
+                transactionId = self._transaction_id_counter
+                self._transaction_id_counter += 1
+                future = Future()
+                self._pending_transactions[transactionId] = future
+                futures.append(future)
+                packets.append(self.__build_packet(command, transactionId, arguments, data))
+            #print(">>> "+"".join(packets))
+            try:
+                self._socket.sendall(bytes("".join(packets), 'UTF-8'))
+                self._round_trip_counter += 1
+            except OSError:
+                for transactionId in range(firstTransactionId, self._transaction_id_counter):
+                    self._pending_transactions.pop(transactionId, None)
+                raise BrokenPipeError("Connection was closed")
+        return futures
+
+    def get_round_trip_count(self):
+        return self._round_trip_counter
+
+    def close(self):
+        self.__shutdown()
+
+    def is_closed(self):
+        return self._is_closed
+
+    def __build_packet(self, command, transactionId, arguments=[], data=None):
+        argumentsString = ""
+        if len(arguments)>0:
+            argumentsString = " "+(" ".join(arguments))
+        dataString = ""
+        if data != None:
+            dataString = " -- " + base64.b64encode(data.encode("utf-8")).decode("utf-8")
+        argumentsString = argumentsString.replace("{{#DATALENGTH#}}", str(len(dataString)-4))
+        return command+" -i "+str(transactionId)+argumentsString+dataString+"\0"
+
+    def __on_readable(self, clientSocket):
+        try:
+            self._packet_reader.receive()
+            while True:
+                root = self._packet_reader.next_packet()
+                if root is None:
+                    break
+                self.__dispatch(root)
+
+        except (OSError, ValueError, ElementTree.ParseError):
+            self.__shutdown()
+
+    def __shutdown(self):
+        # the socket must leave the socket-loop before it gets closed
+        self._socket_loop.remove_reader(self._socket)
+        self._socket_loop.call_soon(self.__close_socket)
+
+        with self._lock:
+            self._is_closed = True
+            pendingTransactions = self._pending_transactions
+            self._pending_transactions = {}
+
+        for future in pendingTransactions.values():
+            future.set_exception(BrokenPipeError("Connection was closed"))
+        if not self._init_future.done():
+            self._init_future.set_exception(BrokenPipeError("Connection was closed"))
+
+    def __close_socket(self):
+        try:
+            self._socket.close()
+        except OSError:
+            pass
+
+    def __dispatch(self, root):
+        tagName = root.tag
+        if "}" in tagName:
+            tagName = tagName.split('}', 1)[1]
+
+        if tagName == "init":
+            self._init_future.set_result(root)
+
+        elif tagName in ["notify", "stream"]:
+            self._notifications.append(root)
+            if self._notify_handler != None:
+                self._notify_handler(root)
+
+        elif 'transaction_id' in root.attrib:
+            with self._lock:
+                future = self._pending_transactions.pop(int(root.attrib['transaction_id']), None)
+            if future != None:
+                future.set_result(root)
@@ -14,23 +14,50 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import socket
-import base64
 import time
+import fnmatch
+import threading
+import traceback
+import base64
+import logging
 import xml.etree.ElementTree as ElementTree
+from collections import deque
+from concurrent.futures import Future
 from gi.repository import GLib, Gtk
-from _thread import start_new_thread
-from AddiksDBGP.GladeHandler import GladeHandler
+from AddiksDBGP.DBGpConnection import DBGpConnection
+from AddiksDBGP.TypeMap import TypeMap
 from AddiksDBGP.helpers import *
 addiksdbgp = __import__("addiks-dbgp")
 
+logger = logging.getLogger(__name__)
+
+# Commands that can be issued from the UI through DebugSession.dispatch().
+DISPATCHABLE_COMMANDS = ['run', 'run_to', 'step_into', 'step_over', 'step_out', 'stop']
+
+# Consecutive dispatches of the same step-command are merged into one batch ("step over x5").
+STEP_COMMANDS = ['step_into', 'step_over', 'step_out']
+
+# Upper limit of engine-steps one step-into may skip before it gives up and shows where it is.
+MAX_SKIPPED_STEPS = 1000
+
+# Seconds a new connection may take to send its init-packet, waiting for it occupies a worker.
+INIT_PACKET_TIMEOUT = 30
+
+# Features the session sets itself with feature_set. They are neither read back from the engine nor
+# taken from (or written to) the capability cache, every session keeps what it negotiated.
+SESSION_FEATURES = ['max_children', 'max_data', 'max_depth']
+
+# Depth of the local variables recorded with every breakpoint-hit in snapshot-mode.
+SNAPSHOT_MAX_DEPTH = 2
+
 class DebugSession:
     def __init__(self, plugin, clientSocket):
         self._plugin  = plugin
         self._client_socket = clientSocket
-        self._is_waiting_for_server = False
+        self._connection = DBGpConnection(clientSocket, plugin.get_socket_loop())
         self._glade_builder = None
         self._glade_handler = None
+        self._session_window = None
         self._options = {
             'fileuri':          None,
             'language':         None,
@@ -38,6 +65,7 @@ class DebugSession:
             'appid':            None,
             'idekey':           None,
             'engine':           None,
+            'engine_version':   None,
             'author':           None,
             'url':              None,
             'copyright':        None,
@@ -53,17 +81,37 @@ class DebugSession:
             'breakpoint_languages':      None,
             'breakpoint_types':          None,
             'multiple_sessions':         None,
-            'max_children':              None,
-            'max_data':                  None,
-            'max_depth':                 None,
+            'max_children':              32, # page size, further children are fetched on demand
+            'max_data':                  1024, # longer strings are truncated, the full value is fetched on demand
+            'max_depth':                 1,  # only the first level, deeper levels are fetched when expanded
             'extended_properties':       None,
         }
-        self._types = []
+        self._typemap = TypeMap()
+        self._is_typemap_refreshed = False
         self._status = 'starting'
-        self._transaction_id_counter = 1
         self._custom_watches = []
         self._path_mapping = None
+        self._step_skip_patterns = []
+        self._is_snapshot_mode = False
+        self._profile_name = None
+        self._profile = None
+        self._init_attributes = {}
+        self._snapshot_file = None
         self._prepared_stack = []
+        self._handshake_statistics = None
+        self._truncated_values = {} # fullname => full size in bytes
+        self._property_contexts = {} # fullname => id of the context the property was found in
+        self._step_cache = {} # (command, depth, context-id, fullname/expression, page) => future
+        self._step_cache_lock = threading.Lock()
+        self._context_names = None
+        self._step_started_at = None
+        self._step_round_trips_at = 0
+        self._run_to_target = None # (local file, line, [future of breakpoint_set]) of a run-to-cursor
+        self._step_statistics = None # round-trips and time from the step-command to the rendered step
+        self._dispatch_queue = deque()
+        self._dispatch_lock = threading.Lock()
+        self._is_dispatching = False
+        self._view_generation = 0 # increased by every execution, older view-refreshes give up
 
     def init(self):
 
@@ -81,88 +129,238 @@ class DebugSession:
 #  <copyright><![CDATA[Copyright (c) 2002-2013 by Derick Rethans]]></copyright>
 #</init>
 
-        initXml = self.__read_xml_packet()
+        if self._profile == None:
+            self.read_init()
+
+        if self._is_snapshot_mode:
+            self._features['max_depth'] = SNAPSHOT_MAX_DEPTH
+
+        # Engines that were seen before do not need to negotiate features and typemap again.
+        capabilityCache = self._plugin.get_engine_capability_cache()
+        capabilities = capabilityCache.get_capabilities(
+            self._options['engine'],
+            self._options['engine_version'],
+            self._options['language']
+        )
+
+        # The whole handshake is sent as one batch, the engine answers the commands in order and
+        # all replies are collected afterwards: one network round-trip instead of one per command.
+        handshakeBegin = time.perf_counter()
+        roundTripsBefore = self._connection.get_round_trip_count()
+        commands = []
+
+        for feature_name in self._features:
+            if self._features[feature_name] != None:
+                commands.append(("feature_set", ['-n '+feature_name, '-v '+str(self._features[feature_name])], None))
+
+        feature_names = [name for name in self._features if name not in SESSION_FEATURES]
+        featureGetIndex = len(commands)
+        typemapIndex = None
+        if capabilities == None:
+            for feature_name in feature_names:
+                commands.append(("feature_get", ['-n '+feature_name], None))
+
+            typemapIndex = len(commands)
+            commands.append(("typemap_get", [], None))
+
+        plugin = addiksdbgp.AddiksDBGPApp.get()
+        breakpoints = plugin.get_all_breakpoints()
+        for filePath in breakpoints:
+            for line in breakpoints[filePath]:
+                condition = plugin.get_breakpoint_condition(filePath, line)
+                arguments, expression = self.__get_breakpoint_arguments({
+                    'filename':   filePath,
+                    'lineno':     line,
+                    'expression': condition,
+                })
+                commands.append(("breakpoint_set", arguments, expression))
+
+        commands.append(("step_into", [], None))
+
+        futures = self._connection.send_commands(commands)
+        responses = [self.__wait_for_response(future) for future in futures]
+
+        if capabilities == None:
+            self.__read_features(feature_names, responses[featureGetIndex:typemapIndex])
+            self._typemap.read_xml(responses[typemapIndex])
+            self.__store_capabilities()
+
+        else:
+            for feature_name, value in capabilities['features'].items():
+                if feature_name not in SESSION_FEATURES:
+                    self._features[feature_name] = value
+            self._typemap.set_entries(capabilities['types'])
+            if capabilityCache.claim_revalidation(
+                self._options['engine'],
+                self._options['engine_version'],
+                self._options['language']
+            ):
+                self.__revalidate_capabilities()
+
+        self._handshake_statistics = {
+            'commands':    len(commands),
+            'round_trips': self._connection.get_round_trip_count() - roundTripsBefore,
+            'duration':    time.perf_counter() - handshakeBegin,
+        }
+        logger.info("DBGp handshake for '%s': %d commands, %d round-trip(s), %.1f ms" % (
+            self._options['idekey'],
+            self._handshake_statistics['commands'],
+            self._handshake_statistics['round_trips'],
+            self._handshake_statistics['duration'] * 1000
+        ))
+
+        if self._is_snapshot_mode:
+            self._snapshot_file = self._plugin.get_snapshot_file(self._options['idekey'])
+            self._plugin.run_in_worker(self.__capture_and_continue, self.is_in_breakpoint())
+        else:
+            GLib.idle_add(self.__show_window)
+
+    def read_init(self):
+        # Waits for the init-packet and looks up the profile of its idekey, nothing is sent yet.
+        # Returns the name of the profile (None if there is none) and the profile itself.
+        initXml = self._connection.get_init_packet(INIT_PACKET_TIMEOUT)
 
         self._options.update(initXml.attrib)
+        self._init_attributes = dict(initXml.attrib)
 
         profileManager = self._plugin.get_profile_manager()
 
         self._path_mapping = None
+        self._profile_name = None
+        self._profile = profileManager.get_profile_defaults()
         for profileName in profileManager.get_profiles():
             profile = profileManager.get_profile(profileName)
             if profile['dbgp_ide_key'] == initXml.attrib['idekey']:
-                self._path_mapping = profileManager.get_pathmapping_manager(profileName)
+                self._path_mapping = profileManager.get_path_mapping(profileName)
+                self._profile_name = profileName
+                self._profile = profile
                 break
 
+        self._step_skip_patterns = self._profile['step_skip_patterns']
+        self._is_snapshot_mode = self._profile['snapshot_mode']
+
         for childXml in initXml:
-            self._options[childXml.tag] = childXml.text
+            tagName = childXml.tag
+            if "}" in tagName:
+                tagName = tagName.split('}', 1)[1]
+            self._options[tagName] = childXml.text
+            if tagName == 'engine' and 'version' in childXml.attrib:
+                self._options['engine_version'] = childXml.attrib['version']
 
-        for feature_name in self._features:
-            if self._features[feature_name] != None:
-                self.__send_command("feature_set", ['-n '+feature_name, '-v '+str(self._features[feature_name])])
+        return self._profile_name, self._profile
 
-        feature_names = self._features.keys()
-        for feature_name in feature_names:
-            featureXml = self.__send_command("feature_get", ['-n '+feature_name])
-            if featureXml.attrib['supported'] == '1':
-                self._features[feature_name] = featureXml.text
+    def close_connection(self):
+        # the engine sees the connection closed and lets the script run on without a debugger
+        self._connection.close()
+
+    def detach(self):
+        # The engine stops debugging and the script runs on on its own.
+        try:
+            self.__send_command("detach")
+            self._connection.close()
+        except BrokenPipeError:
+            pass
+
+    def run_unattended(self):
+        # The script runs to its end without breakpoints and without a window.
+        try:
+            future = self._connection.send_command("run")
+
+            def onRunResponse(future):
+                # called on the socket-loop, which must not block
+                self._plugin.run_in_worker(self.__after_unattended_run, future)
+
+            future.add_done_callback(onRunResponse)
+        except BrokenPipeError:
+            pass
+
+    def __after_unattended_run(self, future):
+        try:
+            if future.result().attrib.get('status') == "break":
+                self.run_unattended() # e.g. an xdebug_break() in the code
             else:
-                self._features[feature_name] = None
+                self.__send_command("stop")
+                self._connection.close()
+        except BrokenPipeError:
+            pass
 
-        self._update_typemap()
+    def get_init_attributes(self):
+        return self._init_attributes
 
-        breakpoints = addiksdbgp.AddiksDBGPApp.get().get_all_breakpoints()
-        for filePath in breakpoints:
-            for line in breakpoints[filePath]:
-                try:
-                    condition = breakpoints[filePath][line]
+    def is_connection_closed(self):
+        return self._connection.is_closed()
 
-                    # Find remote file path.
-                    if self._path_mapping != None:
-                        filePath = self._path_mapping.mapLocalToRemote(filePath)
+    def __read_features(self, feature_names, featureResponses):
+        for feature_name, featureXml in zip(feature_names, featureResponses):
+            if featureXml.attrib.get('supported') == '1':
+                self._features[feature_name] = featureXml.text
+            else:
+                self._features[feature_name] = None
 
-                    self.set_breakpoint({
-                        'filename':   filePath,
-                        'lineno':     line,
-                        'expression': condition,
-                    })
+    def __store_capabilities(self):
+        self._plugin.get_engine_capability_cache().store_capabilities(
+            self._options['engine'],
+            self._options['engine_version'],
+            self._options['language'],
+            {name: value for name, value in self._features.items() if name not in SESSION_FEATURES},
+            self._typemap.get_entries()
+        )
+
+    def __revalidate_capabilities(self):
+        # Re-fetch features and typemap in the background without blocking anyone. The engine answers
+        # in order, so once the last response arrived all others are there as well.
+        feature_names = [name for name in self._features if name not in SESSION_FEATURES]
+        commands = [("feature_get", ['-n '+feature_name], None) for feature_name in feature_names]
+        commands.append(("typemap_get", [], None))
+
+        def onRevalidated(lastFuture):
+            if lastFuture.exception() == None:
+                self._plugin.run_in_worker(self.__after_revalidate_capabilities, feature_names, futures)
 
-                except KeyError:
-                    pass
+        try:
+            futures = self._connection.send_commands(commands)
+            futures[-1].add_done_callback(onRevalidated)
+        except BrokenPipeError:
+            pass
 
-        self.__send_command("step_into")
-        GLib.idle_add(self.__show_window)
+    def __after_revalidate_capabilities(self, feature_names, futures):
+        responses = [future.result() for future in futures]
+        self.__read_features(feature_names, responses[0:-1])
+        typemap = TypeMap()
+        typemap.read_xml(responses[-1])
+        self._typemap = typemap
+        self.__store_capabilities()
 
     def _update_typemap(self):
+        # the typemap does not change during a session, it is fetched again at most once
+        self._is_typemap_refreshed = True
         typesXml = self.__send_command("typemap_get")
-        for mapXml in typesXml:
-            xsiType = None
-            if 'xsi:type' in mapXml.attrib:
-                xsiType = mapXml.attrib['xsi:type']
-            self._types.append([mapXml.attrib['name'], mapXml.attrib['type'], xsiType])
+        self._typemap.read_xml(typesXml)
 
     def __show_window(self):
         builder = self._getGladeBuilder()
         window = builder.get_object("windowSession")
         window.set_title("Running process: " + self._options['idekey']);
         accelGroup = addiksdbgp.AddiksDBGPApp.get().get_all_windows()[0].get_accel_group()
-        if accelGroup != None:
+        if accelGroup != None and not self._session_window.has_accel_group:
             window.add_accel_group(accelGroup)
+            self._session_window.has_accel_group = True
         window.show_all()
-        start_new_thread(self.__after_show_window, ())
+        self._getGladeHandler().updateSessionStatistics(self._handshake_statistics, self._step_statistics)
+        self._plugin.get_session_window_pool().record_time_to_window(self._session_window)
+        self._plugin.run_in_worker(self.__after_show_window)
 
     def __after_show_window(self):
-        if not self.is_in_breakpoint():
+        if self.is_in_breakpoint():
+            self.__update_view(True)
+        else:
             self.run()
-        self.__update_view(True)
 
     def close(self):
         GLib.idle_add(self.__close)
 
     def __close(self):
-        builder = self._getGladeBuilder()
-        window = builder.get_object("windowSession")
-        window.hide()
+        self.__release_window()
 
     def is_in_breakpoint(self):
         stack = self.get_stack()[-1]
@@ -185,107 +383,424 @@ class DebugSession:
     def add_watch(self, definition):
         if definition not in self._custom_watches:
             self._custom_watches.append(definition)
-            self.__update_view()
+            self._plugin.run_in_worker(self.__update_view)
         return None
 
     def remove_watch(self, definition):
         if definition in self._custom_watches:
             self._custom_watches.remove(definition)
-            self.__update_view()
+            self._plugin.run_in_worker(self.__update_view)
 
     def clear_watches(self):
         self._custom_watches = []
-        self.__update_view()
+        self._plugin.run_in_worker(self.__update_view)
 
     def get_watches(self):
         return self._custom_watches
 
     def get_types(self):
-        return self._types
+        return self._typemap.get_entries()
 
     def expand_watch(self, fullName):
-        userInterface = self._getGladeHandler()
-        responseXml = self.eval_expression(fullName)
-        userInterface.setWatchRowValue(fullName, self.__get_value_by_propertyXml(responseXml, fullName, [], propertyType="watch"))
+        self.__merge_expanded_row(fullName, self.eval_expression(fullName), "watch")
 
     def expand_property(self, fullName):
-        userInterface = self._getGladeHandler()
-        responseXml = self.get_property(fullName)
-        userInterface.setWatchRowValue(fullName, self.__get_value_by_propertyXml(responseXml, fullName, [], propertyType="property"))
+        self.__merge_expanded_row(fullName, self.get_property(fullName), "property")
+
+    def load_property_page(self, fullName, page, propertyType="property"):
+        propertyXml = self.get_property(fullName, page)
+        if propertyXml != None:
+            rows = []
+            self.__get_value_by_propertyXml(propertyXml, fullName, rows, propertyType=propertyType)
+            self._getGladeHandler().mergeWatches(rows)
+
+    def __merge_expanded_row(self, fullName, propertyXml, propertyType):
+        if propertyXml != None:
+            # a title of None only updates the value of the (already existing) expanded row
+            rows = [['row', fullName, None, None, None, propertyType]]
+            rows[0][3] = self.__get_value_by_propertyXml(propertyXml, fullName, rows, propertyType=propertyType)
+            self._getGladeHandler().mergeWatches(rows)
 
     def collapse_watch(self, fullName):
         pass
 
     def __hideWindow(self):
-        builder = self._getGladeBuilder()
-        window = builder.get_object("windowSession")
-        window.hide()
+        self.__release_window()
+
+    def __release_window(self):
+        # The window goes back to the pool, updates of this session still coming from workers end
+        # in the (then detached) GladeHandler and are dropped.
+        if self._session_window != None:
+            self._plugin.get_session_window_pool().release(self._session_window)
+            self._session_window = None
 
     ### COMMANDS
 
+    def dispatch(self, command, *arguments):
+        # Returns immediately. The commands run on a worker, one after the other in the order in
+        # which they were dispatched. Only 'stop' jumps the queue.
+        if command not in DISPATCHABLE_COMMANDS:
+            raise Exception("Command '"+command+"' cannot be dispatched!")
+        self._getGladeHandler().setRunningState(True)
+        if command == "stop":
+            # 'stop' does not wait behind a step still in flight, the commands still waiting are dropped
+            with self._dispatch_lock:
+                self._dispatch_queue.clear()
+            self._plugin.run_in_worker(self.__run_dispatched, command, arguments)
+            return
+        with self._dispatch_lock:
+            self._dispatch_queue.append((command, arguments))
+            if self._is_dispatching:
+                return
+            self._is_dispatching = True
+        self._plugin.run_in_worker(self.__drain_dispatch_queue)
+
+    def __drain_dispatch_queue(self):
+        while True:
+            with self._dispatch_lock:
+                if len(self._dispatch_queue) <= 0:
+                    self._is_dispatching = False
+                    return
+                command, arguments = self._dispatch_queue.popleft()
+                count = 1
+                if command in STEP_COMMANDS:
+                    while len(self._dispatch_queue) > 0 and self._dispatch_queue[0][0] == command:
+                        self._dispatch_queue.popleft()
+                        count += 1
+            future = self.__run_dispatched(command, arguments, count)
+            if future != None:
+                # Steps dispatched in the meantime queue up (and get merged) until the engine is
+                # done with this one. No worker waits for that, draining goes on from the response.
+                future.add_done_callback(self.__on_dispatched_step_done)
+                return
+
+    def __on_dispatched_step_done(self, future):
+        # called on the socket-loop, which must not block
+        self._plugin.run_in_worker(self.__drain_dispatch_queue)
+
+    def __run_dispatched(self, command, arguments, count=1):
+        # Returns the future of a step that the engine is still executing.
+        try:
+            if command in STEP_COMMANDS:
+                if count > 1:
+                    logger.debug("Merged %d x %s", count, command)
+                return getattr(self, command)(count)
+            getattr(self, command)(*arguments)
+        except Exception:
+            traceback.print_exc()
+            # the command never reached the engine, nothing else would enable the buttons again
+            self._getGladeHandler().setRunningState(False)
+
     def run(self, clearBreakpoints=False):
         try:
             if clearBreakpoints:
+                # all breakpoints are removed with one round-trip
                 breakpoints = self.list_breakpoints()
-                for breakpointId in breakpoints:
-                    self.remove_breakpoint(breakpointId)
+                futures = self._connection.send_commands([
+                    ("breakpoint_remove", ['-d '+breakpointId], None) for breakpointId in breakpoints
+                ])
+                for future in futures:
+                    self.__wait_for_response(future)
+            self.__execute("run")
+        except BrokenPipeError:
+            self.__on_connection_lost()
+
+    def run_to(self, filePath, line):
+        # A temporary breakpoint (removed by the engine when hit) is set and run in one round-trip,
+        # the persistent breakpoints are not touched.
+        arguments, expression = self.__get_breakpoint_arguments({
+            'filename':  filePath,
+            'lineno':    line,
+            'temporary': "1",
+        })
+        breakpointFutures = []
+        self._run_to_target = (filePath, line, breakpointFutures)
+        return self.__execute("run", 1, [("breakpoint_set", arguments, expression)], breakpointFutures)
+
+    def step_into(self, count=1):
+        if len(self._step_skip_patterns) > 0:
+            return self.__step_into_user_code(count)
+        return self.__execute("step_into", count)
+
+    def __step_into_user_code(self, count=1):
+        # Steps into and right out again of every frame matching a skip-pattern, without any UI work
+        # in between. Every engine-step is sent together with the stack_get that checks where it
+        # ended up, each iteration costs one round-trip.
+        try:
+            with self._step_cache_lock:
+                self._view_generation += 1
+                generation = self._view_generation
+            self._step_started_at = time.perf_counter()
+            self._step_round_trips_at = self._connection.get_round_trip_count()
+            self.__invalidate_step_caches()
             self.cleanup_view()
-            responseXml = self.__send_command("run")
-            self._status = responseXml.attrib['status']
-            self.__update_view(True)
-            if self._status == "stopping":
-                self.stop()
+
+            skippedCount = 0
+            isInBreak = True
+            for stepNumber in range(count):
+                command = "step_into"
+                while isInBreak:
+                    stepFuture, stackFuture = self._connection.send_commands([
+                        (command,     [], None),
+                        ("stack_get", [], None),
+                    ])
+                    responseXml = self.__wait_for_response(stepFuture)
+                    isInBreak = responseXml.attrib.get('status') == 'break'
+                    if not isInBreak:
+                        break
+                    stack = self.__read_stack(self.__wait_for_response(stackFuture))
+                    if len(stack) <= 0 or not self.__is_skipped_frame(stack[-1]):
+                        break
+                    if skippedCount >= MAX_SKIPPED_STEPS:
+                        break
+                    skippedCount += 1
+                    command = "step_out"
+
+            logger.info(
+                "Step into skipped %d engine-steps in %.1f ms",
+                skippedCount,
+                (time.perf_counter() - self._step_started_at) * 1000
+            )
+            self.__after_execution(stepFuture, generation)
+
         except BrokenPipeError:
-            GLib.idle_add(self.__hideWindow)
-            addiksdbgp.AddiksDBGPApp.get().remove_session(self)
+            self.__on_connection_lost()
+
+    def __is_skipped_frame(self, stackEntry):
+        # patterns match the (remote or local) file-path or the function, e.g. 'Symfony\\*'
+        candidates = []
+        if 'filename' in stackEntry:
+            filePath = stackEntry['filename']
+            if filePath[0:7] == 'file://':
+                filePath = filePath[7:]
+            candidates.append(filePath)
+            candidates.append(self.mapRemoteToLocalPath(filePath))
+        if 'where' in stackEntry:
+            candidates.append(stackEntry['where'])
+        for pattern in self._step_skip_patterns:
+            for candidate in candidates:
+                if fnmatch.fnmatchcase(candidate, pattern):
+                    return True
+        return False
+
+    def step_over(self, count=1):
+        return self.__execute("step_over", count)
+
+    def step_out(self, count=1):
+        return self.__execute("step_out", count)
 
-    def step_into(self):
+    def __execute(self, command, count=1, preparingCommands=[], preparingFutures=None):
+        # Execution commands only return when the engine breaks again, which may take forever.
+        # Nothing waits for them, the view is refreshed once the response arrives. Repeated commands
+        # (and the commands preparing them) are sent as one batch, the view is only refreshed for
+        # the last one. The futures of the preparing commands go to 'preparingFutures'.
         try:
+            with self._step_cache_lock:
+                self._view_generation += 1
+                generation = self._view_generation
+            self._step_started_at = time.perf_counter()
+            self._step_round_trips_at = self._connection.get_round_trip_count()
+            self.__invalidate_step_caches()
             self.cleanup_view()
-            responseXml = self.__send_command("step_into")
-            self._status = responseXml.attrib['status']
-            self.__update_view(True)
-            if self._status == "stopping":
-                self.stop()
+            futures = self._connection.send_commands(preparingCommands + [(command, [], None)] * count)
+            if preparingFutures != None:
+                preparingFutures.extend(futures[0:len(preparingCommands)])
+
+            def onExecutionResponse(future):
+                # called on the socket-loop, which must not block
+                self._plugin.run_in_worker(self.__after_execution, future, generation, command)
+
+            futures[-1].add_done_callback(onExecutionResponse)
+            return futures[-1]
         except BrokenPipeError:
-            GLib.idle_add(self.__hideWindow)
-            addiksdbgp.AddiksDBGPApp.get().remove_session(self)
+            self.__on_connection_lost()
+
+    def __is_superseded(self, generation):
+        return generation != self._view_generation
 
-    def step_over(self):
+    def __after_execution(self, future, generation, command=None):
         try:
-            self.cleanup_view()
-            responseXml = self.__send_command("step_over")
-            self._status = responseXml.attrib['status']
-            self.__update_view(True)
+            # an error-response has no status, the engine then did not execute anything
+            responseXml = self.__wait_for_response(future)
+            if self.__is_superseded(generation):
+                return # the engine is already executing again
+            if command == "run" and responseXml.attrib.get('status') == "break":
+                # Logpoints only apply to 'run', a step stops on the line of a logpoint like on any
+                # other line and its values can be seen in the watches.
+                filePath, line = self.__get_break_position(responseXml)
+                expressions = self._plugin.get_breakpoint_log(filePath, line)
+                if len(expressions) > 0:
+                    self.__log_and_continue(filePath, line, expressions)
+                    return
+            self.__remove_run_to_breakpoint(responseXml)
+            self._getGladeHandler().setRunningState(False)
+            self.__update_view(True, generation)
             if self._status == "stopping":
                 self.stop()
         except BrokenPipeError:
+            self.__on_connection_lost()
+        except Exception:
+            traceback.print_exc()
+            if not self.__is_superseded(generation):
+                self._getGladeHandler().setRunningState(False)
+
+    def __remove_run_to_breakpoint(self, responseXml):
+        # A run-to-cursor that ended somewhere else (e.g. at another breakpoint) leaves its temporary
+        # breakpoint in the engine, where it would fire on a later run. A hit one the engine removed.
+        target = self._run_to_target
+        self._run_to_target = None
+        if target == None or responseXml.attrib.get('status') != "break":
+            return
+        filePath, line, breakpointFutures = target
+        if len(breakpointFutures) <= 0 or self.__get_break_position(responseXml) == (filePath, line):
+            return
+        breakpointXml = self.__wait_for_response(breakpointFutures[0])
+        if 'id' in breakpointXml.attrib:
+            self.__send_command("breakpoint_remove", ['-d '+breakpointXml.attrib['id']])
+
+    def __get_break_position(self, responseXml):
+        # xdebug tells where it stopped in the response itself, other engines need a stack_get
+        remotePath = None
+        line = 0
+        for childXml in responseXml:
+            if childXml.tag.endswith("}message") and 'filename' in childXml.attrib:
+                remotePath = childXml.attrib['filename']
+                line = int(childXml.attrib.get('lineno', 0))
+        if remotePath == None:
+            for stackEntry in self.get_stack():
+                if int(stackEntry['level']) == 0:
+                    remotePath = stackEntry['filename']
+                    line = int(stackEntry['lineno'])
+            if remotePath == None:
+                return None, 0
+        if remotePath[0:7] == 'file://':
+            remotePath = remotePath[7:]
+        return self.mapRemoteToLocalPath(remotePath), line
+
+    def __log_and_continue(self, filePath, line, expressions):
+        # A logpoint was hit: the expressions are evaluated and the engine runs on, all in one
+        # round-trip. The view is not refreshed, the session just keeps running.
+        try:
+            with self._step_cache_lock:
+                self._view_generation += 1
+                generation = self._view_generation
+            self.__invalidate_step_caches()
+            commands = [("eval", [], expression) for expression in expressions]
+            futures = self._connection.send_commands(commands + [("run", [], None)])
+
+            def onExecutionResponse(future):
+                # called on the socket-loop, which must not block
+                self._plugin.run_in_worker(self.__after_execution, future, generation, "run")
+
+            futures[-1].add_done_callback(onExecutionResponse)
+
+            values = []
+            for expression, evalFuture in zip(expressions, futures):
+                # not waited for with __wait_for_response, the status belongs to the run-command now
+                propertyXml = self.__get_first_child(evalFuture.result())
+                value = "could not get value"
+                if propertyXml != None:
+                    # a typemap_get now would be queued behind the run and wait for the next break
+                    value = self.__get_value_by_propertyXml(propertyXml, expression, [], False, propertyType="watch")
+                values.append(expression + " = " + str(value))
+
+            logLine = "%s.%03d %s:%d %s" % (
+                time.strftime("%Y-%m-%d %H:%M:%S"),
+                int(time.time() * 1000) % 1000,
+                filePath,
+                line,
+                "; ".join(values)
+            )
+            self._plugin.append_logpoint_log(logLine)
+            self._getGladeHandler().appendLog(logLine)
+
+        except BrokenPipeError:
+            self.__on_connection_lost()
+
+    def __on_connection_lost(self):
+        if self._glade_builder != None:
             GLib.idle_add(self.__hideWindow)
-            addiksdbgp.AddiksDBGPApp.get().remove_session(self)
+        addiksdbgp.AddiksDBGPApp.get().remove_session(self)
+
+    ### SNAPSHOT-MODE
 
-    def step_out(self):
+    # Every breakpoint-hit gets recorded to the snapshot-file of the idekey and the engine runs on at
+    # once, no window is shown. Reading the stack and the locals and resuming is one single write.
+
+    def __capture_and_continue(self, isCapturing=True):
+        commands = []
+        if isCapturing:
+            commands.append(("stack_get", [], None))
+            commands.append(("context_get", ["-c 0"], None))
+        commands.append(("run", [], None))
         try:
-            self.cleanup_view()
-            responseXml = self.__send_command("step_out")
+            futures = self._connection.send_commands(commands)
+
+            def onRunResponse(future):
+                # called on the socket-loop, which must not block
+                self._plugin.run_in_worker(self.__after_snapshot_run, future)
+
+            futures[-1].add_done_callback(onRunResponse)
+
+            if isCapturing:
+                self.__write_snapshot(futures[0].result(), futures[1].result())
+
+        except BrokenPipeError:
+            self.__on_connection_lost()
+
+    def __after_snapshot_run(self, future):
+        try:
+            responseXml = future.result()
             self._status = responseXml.attrib['status']
-            self.__update_view(True)
-            if self._status == "stopping":
-                self.stop()
+            if self._status == "break":
+                self.__capture_and_continue()
+            elif self._status == "stopping":
+                self.__send_command("stop")
+                self._connection.close()
+                self.__on_connection_lost()
         except BrokenPipeError:
-            GLib.idle_add(self.__hideWindow)
-            addiksdbgp.AddiksDBGPApp.get().remove_session(self)
+            self.__on_connection_lost()
+
+    def __write_snapshot(self, stackXml, contextXml):
+        filePath = None
+        line = 0
+        stackRows = []
+        for stackEntry in self.__read_stack(stackXml):
+            uri = self.mapRemoteToLocalPath(stackEntry['filename'])
+            if int(stackEntry['level']) == 0:
+                filePath = uri
+                line = int(stackEntry['lineno'])
+            stackRows.append((uri, stackEntry['lineno'], stackEntry.get('where', "")))
+        if filePath == None:
+            return
+        if filePath[0:7] == 'file://':
+            filePath = filePath[7:]
+
+        rows = []
+        for propertyXml in contextXml:
+            fullName, name = self.__readXmlElementNames(propertyXml)
+            if fullName != None:
+                # a typemap_get now would be queued behind the run and wait for the next break
+                self.__add_watch_row(rows, fullName, name, None, "property", propertyXml, False)
+
+        self._snapshot_file.append({
+            'time':     time.time(),
+            'filename': filePath,
+            'lineno':   line,
+            'idekey':   self._options['idekey'],
+            'stack':    stackRows,
+            'rows':     [row for row in rows if row[0] == 'row'], # nothing can be loaded later on
+        })
 
     def stop(self):
         try:
             responseXml = self.__send_command("stop")
             self._status = responseXml.attrib['status']
-            self._client_socket.close()
+            self._connection.close()
             self.__update_view()
-            GLib.idle_add(self.__hideWindow)
-            addiksdbgp.AddiksDBGPApp.get().remove_session(self)
+            self.__on_connection_lost()
         except BrokenPipeError:
-            GLib.idle_add(self.__hideWindow)
-            addiksdbgp.AddiksDBGPApp.get().remove_session(self)
+            self.__on_connection_lost()
 
     def set_breakpoint(self, input_options={}):
         arguments, expression = self.__get_breakpoint_arguments(input_options)
@@ -329,15 +844,65 @@ class DebugSession:
         arguments.append("-d "+breakpoint_id)
         responseXml = self.__send_command("breakpoint_update", arguments, expression)
 
-    def get_property(self, fullName):
-        responseXml = self.__send_command("property_get", ['-n '+fullName])
-        if len(responseXml)>0:
-            return responseXml[0]
+    def get_property(self, fullName, page=0):
+        return self.__get_first_child(self.__wait_for_response(self.get_property_async(fullName, page)))
+
+    def get_property_async(self, fullName, page=0):
+        contextId = self._property_contexts.get(fullName, '0')
+        arguments = ['-n '+fullName]
+        if contextId != '0':
+            arguments.append('-c '+contextId)
+        if page > 0:
+            arguments.append('-p '+str(page))
+        return self.__send_cached_command(("property_get", 0, contextId, fullName, page), arguments)
 
     def set_property(self, fullName, typeName, newValue):
         responseXml = self.__send_command("property_set", ['-n '+fullName, '-t '+typeName, '-l {{#DATALENGTH#}}'], newValue)
+        self.__invalidate_step_caches()
         self.__update_view()
 
+    def is_truncated(self, fullName):
+        # the shown value of the property is cut off at 'max_data'
+        with self._step_cache_lock:
+            return fullName in self._truncated_values
+
+    def get_full_value(self, fullName, propertyType="property"):
+        # Returns the untruncated value of a string that was truncated at 'max_data', or None if the
+        # value was not truncated. Fetched values are kept until the engine executes again.
+        with self._step_cache_lock:
+            generation = self._view_generation
+            size = self._truncated_values.get(fullName)
+            contextId = self._property_contexts.get(fullName, '0')
+        if size == None:
+            return None
+        cacheKey = ("property_value", 0, contextId, fullName, size)
+        with self._step_cache_lock:
+            future = self._step_cache.get(cacheKey)
+        if future == None:
+            if propertyType == "watch":
+                # eval has no max-data argument, the limit is lifted just for this one command. The
+                # three commands go out with one write under the connection-lock and the engine
+                # processes commands strictly in order, so no read of another thread can end up
+                # between them and see the lifted limit.
+                futures = self._connection.send_commands([
+                    ("feature_set", ['-n max_data', '-v '+str(size)], None),
+                    ("eval", [], fullName),
+                    ("feature_set", ['-n max_data', '-v '+str(self._features['max_data'])], None),
+                ])
+                responseXml = self.__get_first_child(self.__wait_for_response(futures[1]))
+                self.__wait_for_response(futures[2])
+            else:
+                responseXml = self.__send_command("property_value", ['-n '+fullName, '-m '+str(size)])
+            if responseXml == None:
+                return None
+            future = Future()
+            future.set_result(self.__readXmlElementContent(responseXml))
+            with self._step_cache_lock:
+                # a value read before the engine executed again must not end up in the new cache
+                if generation == self._view_generation:
+                    future = self._step_cache.setdefault(cacheKey, future)
+        return future.result()
+
     def get_max_stack_depth(self):
         responseXml = self.__send_command("stack-depth")
         return responseXml.attrib['depth']
@@ -349,18 +914,26 @@ class DebugSession:
             arguments.append("-d "+depth)
         stack = []
         if self._status in ['running', 'break']:
-            responseXml = self.__send_command("stack_get")
-            for stackXml in responseXml:
-                if stackXml.tag == "error":
-                    break
-                stack.append(stackXml.attrib)
-            if len(stack)>0 and 'level' in stack[0]:
-                stack.sort(key=lambda entry: int(entry['level']), reverse=True)
+            cacheKey = ("stack_get", int(depth or 0), None, None, 0)
+            stack = self.__read_stack(self.__wait_for_response(self.__send_cached_command(cacheKey, arguments)))
         if glib_idle_add != None:
             GLib.idle_add(glib_idle_add, stack)
         return stack
 
+    def __read_stack(self, responseXml):
+        stack = []
+        for stackXml in responseXml:
+            if stackXml.tag == "error":
+                break
+            stack.append(dict(stackXml.attrib)) # copied, the response may be cached
+        if len(stack)>0 and 'level' in stack[0]:
+            stack.sort(key=lambda entry: int(entry['level']), reverse=True)
+        return stack
+
     def get_context_names(self, depth=None):
+        # The available contexts do not change while the engine runs, they are only asked for once.
+        if depth == None and self._context_names != None:
+            return self._context_names
         arguments = []
         if depth != None:
             arguments.append("-d "+depth)
@@ -369,6 +942,8 @@ class DebugSession:
             responseXml = self.__send_command("context_names", arguments)
             for contextXml in responseXml:
                 names[contextXml.attrib['name']] = contextXml.attrib['id']
+            if depth == None:
+                self._context_names = names
         return names
 
     def get_context(self, context_name_id, depth=None):
@@ -379,52 +954,119 @@ class DebugSession:
             if depth != None:
                 arguments.append("-d "+depth)
 
-            responseXml = self.__send_command("context_get", arguments)
+            cacheKey = ("context_get", int(depth or 0), context_name_id, None, 0)
+            responseXml = self.__wait_for_response(self.__send_cached_command(cacheKey, arguments))
         return responseXml
 
     def eval_expression(self, expression):
-        responseXml = self.__send_command("eval", [], expression)
+        return self.__get_first_child(self.__wait_for_response(self.eval_expression_async(expression)))
+
+    def eval_expression_async(self, expression):
+        return self.__send_cached_command(("eval", 0, None, expression, 0), [], expression)
+
+    ### HELPERS
+
+    def __get_first_child(self, responseXml):
         if len(responseXml)>0:
             return responseXml[0]
 
-    ### HELPERS
+    def __invalidate_step_caches(self):
+        # everything fetched so far may be outdated once the engine executed code
+        with self._step_cache_lock:
+            self._truncated_values = {}
+            self._property_contexts = {}
+            self._step_cache = {}
+
+    def __send_cached_command(self, cacheKey, arguments=[], data=None):
+        return self.__send_cached_commands([(cacheKey, arguments, data)])[0]
+
+    def __send_cached_commands(self, commands):
+        # Reads of the same state are sent only once per step. The future is cached (instead of
+        # the response), so that a read still in flight is shared as well. All reads that are not
+        # cached yet are sent with one write.
+        with self._step_cache_lock:
+            missingCommands = []
+            for cacheKey, arguments, data in commands:
+                if cacheKey not in self._step_cache:
+                    missingCommands.append((cacheKey, arguments, data))
+            if len(missingCommands) > 0:
+                futures = self._connection.send_commands([
+                    (cacheKey[0], arguments, data) for cacheKey, arguments, data in missingCommands
+                ])
+                for (cacheKey, arguments, data), future in zip(missingCommands, futures):
+                    self._step_cache[cacheKey] = future
+            return [self._step_cache[cacheKey] for cacheKey, arguments, data in commands]
+
+    def __cache_context_properties(self, contextId, parentXml, generation):
+        # Properties of a context-response that came with all their children (up to max_depth)
+        # are the same as what property_get would return for them. Responses of an older step
+        # are not cached anymore.
+        for propertyXml in parentXml:
+            fullName, name = self.__readXmlElementNames(propertyXml)
+            if fullName == None:
+                continue
+            with self._step_cache_lock:
+                if generation != self._view_generation:
+                    return
+                self._property_contexts[fullName] = contextId
+            if len(propertyXml) > 0 and int(propertyXml.attrib.get('page', 0)) == 0:
+                responseXml = ElementTree.Element("response")
+                responseXml.append(propertyXml)
+                future = Future()
+                future.set_result(responseXml)
+                with self._step_cache_lock:
+                    if generation != self._view_generation:
+                        return
+                    self._step_cache.setdefault(("property_get", 0, contextId, fullName, 0), future)
+                self.__cache_context_properties(contextId, propertyXml, generation)
 
     def get_prepared_stack(self):
         return self._prepared_stack
 
-    def cleanup_view(self, doUpdateStackMarks=True):
-        userInterface = self._getGladeHandler()
-        userInterface.clearStack()
-        userInterface.clearWatches()
-        if doUpdateStackMarks:
-            self._prepared_stack = []
-            for view in addiksdbgp.AddiksDBGPApp.get().get_all_views():
-                GLib.idle_add(view.update_stack_marks)
+    def cleanup_view(self):
+        # The watches and the stack stay visible while the engine runs, the next update only
+        # applies what changed.
+        self._prepared_stack = []
+        for view in addiksdbgp.AddiksDBGPApp.get().get_all_views():
+            GLib.idle_add(view.update_stack_marks)
 
-    def __update_view(self, openTopFile=False):
+    def __update_view(self, openTopFile=False, generation=None):
+        # Gives up as soon as the engine executes again, only the newest state is rendered.
+        if generation == None:
+            generation = self._view_generation
         try:
-            ### CLEANUP
-
             userInterface = self._getGladeHandler()
-            scroll = userInterface.getWatchesScrollPosition()
-
-            self.cleanup_view(False)
+            watchDefinitions = list(self._custom_watches)
 
             if self._status in ['stopping', 'stopped']:
                 self._prepared_stack = []
             else:
-                self._prepared_stack = self.get_stack()
+                # All reads of the step are sent at once, the responses arrive in this order.
+                contextNames = self.get_context_names() # only a round-trip for the first step
+                commands = [(("stack_get", 0, None, None, 0), [], None)]
+                for definition in watchDefinitions:
+                    commands.append((("eval", 0, None, definition, 0), [], definition))
+                for contextNameId in contextNames.values():
+                    commands.append((("context_get", 0, contextNameId, None, 0), ["-c "+contextNameId], None))
+                futures = self.__send_cached_commands(commands)
+                stack = self.__read_stack(self.__wait_for_response(futures[0]))
+                if self.__is_superseded(generation):
+                    return
+                self._prepared_stack = stack
 
             for view in addiksdbgp.AddiksDBGPApp.get().get_all_views():
                 GLib.idle_add(view.update_stack_marks)
 
             if self._status in ['stopping', 'stopped']:
+                userInterface.updateStack([])
+                userInterface.updateWatches([])
                 return
 
             ### STACK-TRACE
 
             topStackFilepath = None
             topStackLineNr = 0
+            stackRows = []
             for stack in self._prepared_stack:
 
                 if self._path_mapping != None:
@@ -438,53 +1080,108 @@ class DebugSession:
                 if "where" in stack:
                     where = stack["where"]
 
-                line = stack["lineno"]
+                stackRows.append((stack["filename"], stack["lineno"], where))
 
-                filepath = stack["filename"]
-                filename = stack["filename"].split("/")[-1]
-
-                userInterface.addStackRow(filepath, line, where)
+            userInterface.updateStack(stackRows)
 
             if openTopFile and topStackFilepath != None:
                 GLib.idle_add(self.open_uri_resouce, topStackFilepath, topStackLineNr)
 
             ### WATCHES
 
-            expandFullNames = []
+            rows = []
+
+            watchFutures = futures[1:len(watchDefinitions)+1]
 
-            for definition in self._custom_watches:
-                propertyXml = self.eval_expression(definition)
-                userInterface.addWatchRow(definition, definition, None, None, "watch")
-                value = self.__get_value_by_propertyXml(propertyXml, definition, expandFullNames, propertyType="watch")
-                print(value)
-                userInterface.setWatchRowValue(definition, value)
+            for definition, watchFuture in zip(watchDefinitions, watchFutures):
+                propertyXml = self.__get_first_child(self.__wait_for_response(watchFuture))
+                self.__add_watch_row(rows, definition, definition, None, "watch", propertyXml)
 
-            writtenFullNames = []
-            contextNames = self.get_context_names()
-            for contextName in contextNames:
-                contextNameId = contextNames[contextName]
-                contextXml = self.get_context(contextNameId)
+            writtenFullNames = set(watchDefinitions)
+            contextFutures = futures[len(watchDefinitions)+1:]
+            for contextNameId, contextFuture in zip(contextNames.values(), contextFutures):
+                contextXml = self.__wait_for_response(contextFuture)
+                self.__cache_context_properties(contextNameId, contextXml, generation)
 
                 for propertyXml in contextXml:
                     fullName, name = self.__readXmlElementNames(propertyXml)
 
                     if fullName != None and fullName not in writtenFullNames:
-                        userInterface.addWatchRow(fullName, name, None, None, "property")
-                        userInterface.setWatchRowValue(fullName, self.__get_value_by_propertyXml(propertyXml, fullName, expandFullNames))
-                        writtenFullNames.append(fullName)
+                        self.__add_watch_row(rows, fullName, name, None, "property", propertyXml)
+                        writtenFullNames.add(fullName)
 
-            for fullName in expandFullNames:
-                userInterface.expandWatchRow(fullName)
+            if self.__is_superseded(generation):
+                return
+
+            self.__fetch_expanded_rows(rows, generation)
+
+            if self.__is_superseded(generation):
+                return
+
+            # only the difference to what is shown right now gets applied to the view
+            userInterface.updateWatches(rows)
 
-            userInterface.setWatchesScrollPosition(scroll)
+            if self._step_started_at != None:
+                userInterface.callWhenUpdated(self.__record_step_statistics, self._step_started_at, self._step_round_trips_at)
+                self._step_started_at = None
 
         except BrokenPipeError:
-            GLib.idle_add(self.__hideWindow)
-            addiksdbgp.AddiksDBGPApp.get().remove_session(self)
+            self.__on_connection_lost()
+
+    def __record_step_statistics(self, startedAt, roundTripsAt):
+        # called by the UI once the step is rendered
+        self._step_statistics = {
+            'round_trips': self._connection.get_round_trip_count() - roundTripsAt,
+            'duration':    time.perf_counter() - startedAt,
+        }
+        logger.debug("Step rendered after %.1f ms", self._step_statistics['duration'] * 1000)
+        self._getGladeHandler().updateSessionStatistics(self._handshake_statistics, self._step_statistics)
+
+    def __fetch_expanded_rows(self, rows, generation):
+        # Rows that are expanded in the view need their children again. They are fetched level by
+        # level, every level with one round-trip.
+        expandedFullNames = self._getGladeHandler().getExpandedWatches()
+        rowTypes = {}
+        for row in rows:
+            if row[0] == 'row':
+                rowTypes[row[1]] = row[5]
 
-    def __get_value_by_propertyXml(self, propertyXml, parentFullName, expandFullNames=[], tryTypemapUpdate=True, propertyType="property"):
-        userInterface = self._getGladeHandler()
+        while True:
+            pendingFullNames = []
+            for row in rows:
+                if row[0] == 'placeholder' and row[1] in expandedFullNames:
+                    pendingFullNames.append(row[1])
+            if len(pendingFullNames) <= 0 or self.__is_superseded(generation):
+                break
 
+            futures = []
+            for fullName in pendingFullNames:
+                if rowTypes[fullName] == "watch":
+                    futures.append(self.eval_expression_async(fullName))
+                else:
+                    futures.append(self.get_property_async(fullName))
+
+            rows[:] = [row for row in rows if row[0] != 'placeholder' or row[1] not in pendingFullNames]
+
+            for fullName, future in zip(pendingFullNames, futures):
+                propertyXml = self.__get_first_child(self.__wait_for_response(future))
+                if propertyXml != None:
+                    childRows = []
+                    self.__get_value_by_propertyXml(propertyXml, fullName, childRows, propertyType=rowTypes[fullName])
+                    for row in childRows:
+                        if row[0] == 'row':
+                            rowTypes[row[1]] = row[5]
+                    rows.extend(childRows)
+
+    def __add_watch_row(self, rows, fullName, title, parentFullName, rowType, propertyXml, tryTypemapUpdate=True):
+        # the row has to come before the rows of its children
+        row = ['row', fullName, title, None, parentFullName, rowType]
+        rows.append(row)
+        if propertyXml != None:
+            row[3] = self.__get_value_by_propertyXml(propertyXml, fullName, rows, tryTypemapUpdate, propertyType=rowType)
+
+    def __get_value_by_propertyXml(self, propertyXml, parentFullName, rows, tryTypemapUpdate=True, propertyType="property"):
+        # Child-rows are appended to 'rows', the value of the property itself is returned.
         tagName = propertyXml.tag
 
         if "}" in tagName:
@@ -499,9 +1196,7 @@ class DebugSession:
         dataType = propertyXml.attrib['type']
         originalDataType = dataType
 
-        for typeName, dbgpType, xsiType in self._types:
-            if dataType == typeName:
-                dataType = dbgpType
+        dataType = self._typemap.get_common_type(dataType)
 
         if dataType == 'uninitialized':
             return "{uninitialized}"
@@ -516,10 +1211,10 @@ class DebugSession:
                     if propertyType == "watch":
                         fullName = parentFullName + "->" + name # ??? How to determine what to do here? (This only works for PHP)
 
-                    userInterface.addWatchRow(fullName, name, None, parentFullName, propertyType)
-                    userInterface.setWatchRowValue(fullName, self.__get_value_by_propertyXml(childPropertyXml, fullName, expandFullNames, propertyType=propertyType))
-            else:
-                userInterface.addWatchRow(None, None, None, parentFullName, propertyType)
+                    self.__add_watch_row(rows, fullName, name, parentFullName, propertyType, childPropertyXml, tryTypemapUpdate)
+                self.__add_load_more_row(rows, propertyXml, parentFullName, propertyType)
+            elif self.__has_children(propertyXml):
+                rows.append(['placeholder', parentFullName])
             return "object(" + propertyXml.attrib['numchildren'] + ") : " + propertyXml.attrib['classname']
 
         elif dataType == 'array': # like a list
@@ -537,19 +1232,25 @@ class DebugSession:
                         if propertyType == "watch":
                             fullName = parentFullName + "[" + name + "]"
 
-                        userInterface.addWatchRow(fullName, name, None, parentFullName, propertyType)
-                        userInterface.setWatchRowValue(fullName, self.__get_value_by_propertyXml(childPropertyXml, fullName, expandFullNames, propertyType=propertyType))
+                        self.__add_watch_row(rows, fullName, name, parentFullName, propertyType, childPropertyXml, tryTypemapUpdate)
                 if not contentFound:
                     return self.__readXmlElementContent(childPropertyXml)
-            else:
-                userInterface.addWatchRow(None, None, None, parentFullName, propertyType)
+                self.__add_load_more_row(rows, propertyXml, parentFullName, propertyType)
+            elif self.__has_children(propertyXml):
+                rows.append(['placeholder', parentFullName])
             if 'numchildren' in propertyXml.attrib:
                 return originalDataType + "(" + propertyXml.attrib['numchildren'] + ")"
             else:
                 return originalDataType
 
         elif dataType in ['string', 'float', 'int']:
-            return self.__readXmlElementContent(propertyXml)
+            content = self.__readXmlElementContent(propertyXml)
+            if 'size' in propertyXml.attrib and type(content) == str:
+                size = int(propertyXml.attrib['size'])
+                if len(content.encode("utf-8")) < size:
+                    self._truncated_values[parentFullName] = size
+                    content += " ... [truncated, " + str(size) + " bytes]"
+            return content
 
         elif dataType in ['bool']:
             if propertyXml.text == '1':
@@ -560,9 +1261,9 @@ class DebugSession:
         elif dataType in ['resource', 'null']:
             return "{"+originalDataType+"}"
 
-        if tryTypemapUpdate:
+        if tryTypemapUpdate and not self._is_typemap_refreshed:
             self._update_typemap()
-            return self.__get_value_by_propertyXml(propertyXml, parentFullName, expandFullNames, False, propertyType=propertyType)
+            return self.__get_value_by_propertyXml(propertyXml, parentFullName, rows, False, propertyType=propertyType)
 
         content = self.__readXmlElementContent(propertyXml)
         if type(content) == str:
@@ -570,6 +1271,21 @@ class DebugSession:
 
         return "{unknown type: '"+propertyXml.attrib['type']+"'}"
 
+    def __has_children(self, propertyXml):
+        return propertyXml.attrib.get('numchildren', '1') != '0'
+
+    def __add_load_more_row(self, rows, propertyXml, parentFullName, propertyType):
+        # children are transferred in pages of 'max_children', offer to fetch the next one
+        pageSize = propertyXml.attrib.get('pagesize', self._features['max_children'])
+        if 'numchildren' not in propertyXml.attrib or pageSize == None:
+            return
+        page          = int(propertyXml.attrib.get('page', 0))
+        pageSize      = int(pageSize)
+        childrenCount = int(propertyXml.attrib['numchildren'])
+        loadedCount   = (page + 1) * pageSize
+        if pageSize > 0 and childrenCount > loadedCount:
+            rows.append(['more', parentFullName, page + 1, childrenCount - loadedCount, propertyType])
+
     def __readXmlElementContent(self, contentXml):
         for valueXml in contentXml.findall('{urn:debugger_protocol_v1}value'):
             return self.__readXmlElementContent(valueXml)
@@ -677,75 +1393,15 @@ class DebugSession:
         return [arguments, expression]
 
     def __send_command(self, command, arguments=[], data=None):
-        clientSocket = self._client_socket
-        transactionId = self._transaction_id_counter
-        self._transaction_id_counter += 1
-        argumentsString = ""
-        if(len(arguments)>0):
-            argumentsString = " "+(" ".join(arguments))
-        if command not in ["breakpoint_set"] and False:
-            dataString = " -- "
-        else:
-            dataString = ""
-        if data != None:
-            dataString = " -- " + base64.b64encode(data.encode("utf-8")).decode("utf-8")
-        argumentsString = argumentsString.replace("{{#DATALENGTH#}}", str(len(dataString)-4))
-        packet = command+" -i "+str(transactionId)+argumentsString+dataString+"\0"
-        #print(">>> "+packet)
-
-        # there is already a command being executed,
-        # wait until it is finished
-        while self._is_waiting_for_server:
-            time.sleep(1)
-
-        self._is_waiting_for_server = True
-        clientSocket.send(bytes(packet, 'UTF-8'))
-        xml = self.__read_xml_packet(transactionId)
-        self._is_waiting_for_server = False
-        return xml
-
-    def __read_xml_packet(self, transactionId=None):
-        clientSocket = self._client_socket
-
-        packetBegin = clientSocket.recv(128).decode("utf-8")
-
-        if len(packetBegin)<=0:
-            raise socket.Error("Connection was closed")
+        return self.__wait_for_response(self.__send_command_async(command, arguments, data))
 
-        while True:
-            if len(packetBegin)>0:
-                break
-            time.sleep(0.005)
-        lengthString, xmlData = packetBegin.split('\0', 1)
-
-        pendingDataSize = int(lengthString) - len(xmlData)
-        while pendingDataSize > 0:
-            dataBlock = clientSocket.recv(pendingDataSize).decode("utf-8")
-            pendingDataSize -= len(dataBlock)
-            xmlData += dataBlock
-
-        endingNullByte = clientSocket.recv(1)
-
-        xmlData = xmlData.replace("\\n", "\n")
-        xmlData = xmlData.replace("\\x00", "")
-        xmlData = xmlData.replace("\0", "")
-
-        if xmlData[-1] == "'":
-            xmlData = xmlData[0:-1]
-
-        #print("<<< ("+lengthString+"):"+xmlData+"\n")
-
-        root = ElementTree.fromstring(xmlData)
-
-        # make sure response and request are for the same transaction
-        if transactionId != None and 'transaction_id' in root.attrib:
-            if transactionId != int(root.attrib['transaction_id']):
-                #print("+++ Skipped packet because wrong transaction_id\n")
-                root = self.__read_xml_packet(transactionId)
+    def __send_command_async(self, command, arguments=[], data=None):
+        return self._connection.send_command(command, arguments, data)
 
+    def __wait_for_response(self, future):
+        root = future.result()
         if "status" in root.attrib:
             self._status = root.attrib['status']
-
         return root
 
     def _getGladeHandler(self):
@@ -759,7 +1415,6 @@ class DebugSession:
         return self._glade_builder
 
     def __initGlade(self):
-        self._glade_builder = Gtk.Builder()
-        self._glade_builder.add_from_file(os.path.dirname(__file__)+"/../addiks-dbgp.glade")
-        self._glade_handler = GladeHandler(self._plugin, self._glade_builder, session=self)
-        self._glade_builder.connect_signals(self._glade_handler)
+        self._session_window = self._plugin.get_session_window_pool().acquire(self)
+        self._glade_builder = self._session_window.builder
+        self._glade_handler = self._session_window.handler
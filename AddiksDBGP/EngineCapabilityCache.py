@@ -0,0 +1,75 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import ast
+import threading
+from AddiksDBGP.helpers import file_get_contents, file_put_contents
+
+# Remembers the features and the typemap of every debugging engine (by name, version and language)
+# that ever connected, so that new sessions of known engines do not have to negotiate them again.
+class EngineCapabilityCache:
+
+    def __init__(self, plugin):
+        self._plugin = plugin
+        self._entries = None
+        self._revalidated_keys = set()
+        self._lock = threading.Lock()
+
+    def get_capabilities(self, engine, engineVersion, language):
+        with self._lock:
+            entries = self.__get_entries()
+            key = self.__build_key(engine, engineVersion, language)
+            if key in entries:
+                return entries[key]
+
+    def claim_revalidation(self, engine, engineVersion, language):
+        # Cached capabilities get re-checked by one session per engine and gedit-run, not by all of them.
+        with self._lock:
+            key = self.__build_key(engine, engineVersion, language)
+            if key in self._revalidated_keys:
+                return False
+            self._revalidated_keys.add(key)
+            return True
+
+    def store_capabilities(self, engine, engineVersion, language, features, types):
+        capabilities = {
+            'features': dict(features),
+            'types':    [list(typeEntry) for typeEntry in types],
+        }
+        with self._lock:
+            entries = self.__get_entries()
+            key = self.__build_key(engine, engineVersion, language)
+            if entries.get(key) != capabilities:
+                entries[key] = capabilities
+                file_put_contents(self.__get_cache_filepath(), ascii(entries))
+
+    def __get_entries(self):
+        if self._entries == None:
+            self._entries = {}
+            filePath = self.__get_cache_filepath()
+            if os.path.exists(filePath):
+                try:
+                    self._entries = ast.literal_eval(file_get_contents(filePath))
+                except (ValueError, SyntaxError):
+                    pass # broken cache-file, will be overwritten
+        return self._entries
+
+    def __build_key(self, engine, engineVersion, language):
+        return "%s|%s|%s" % (engine, engineVersion, language)
+
+    def __get_cache_filepath(self):
+        return self._plugin.get_data_dir() + "/engine-capabilities"
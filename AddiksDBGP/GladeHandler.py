@@ -14,12 +14,23 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from gi.repository import GLib, Gtk, Gdk
+from gi.repository import GLib, Gtk, Gdk, Pango
 from AddiksDBGP.helpers import *
-from _thread import start_new_thread
+from AddiksDBGP.WatchesTreeModel import WatchesTreeModel
+from collections import deque
+import threading
 import traceback
+import logging
 import time
 
+logger = logging.getLogger(__name__)
+
+# Inserting more rows than this into the watches at once happens with the model detached from the view.
+WATCHES_DETACH_THRESHOLD = 500
+
+# lines kept in the logpoint-log of the session-window (the log-file keeps everything)
+LOG_MAX_LINES = 5000
+
 class GladeHandler:
     def __init__(self, plugin, builder, profile_manager=None, session=None, path_mapping_manager=None):
         self._plugin               = plugin
@@ -29,11 +40,28 @@ class GladeHandler:
         self._session              = session
         self._watches              = {}
         self._watches_placeholder  = {}
+        self._watches_load_more    = {}
+        self._watch_values         = {}
+        self._watch_parents        = {}
+        self._expanded_watches     = frozenset()
+        self._watches_model        = None
+        self._is_restoring_watches = False
+        self._ui_operations        = deque()
+        self._ui_lock              = threading.Lock()
+        self._is_flush_scheduled   = False
+        self._ui_step_statistics   = None
+        self.__resetStepStatistics()
 
     def onCloseWindow(self, widget=None, data=None):
         widget.hide()
         return True
 
+    def onCloseSessionWindow(self, widget=None, data=None):
+        # the (pooled) window must not be destroyed, closing it ends the session instead
+        widget.hide()
+        self._session.dispatch("stop")
+        return True
+
     ### PROFILE MANAGER
 
     def updateDbgpVisibility(self, checkbox=None):
@@ -67,7 +95,18 @@ class GladeHandler:
             'dbgp_active':  builder.get_object("checkbuttonUseDbgp").get_active(),
             'dbgp_host':    builder.get_object("entryDbgpHost")     .get_text(),
             'dbgp_port':    builder.get_object("spinbuttonDbgpPort").get_value(),
-            'dbgp_ide_key': builder.get_object("entryDbgpIDEKey")   .get_text()
+            'dbgp_ide_key': builder.get_object("entryDbgpIDEKey")   .get_text(),
+            'step_skip_patterns': [
+                pattern.strip() for pattern in builder.get_object("entryStepSkipPatterns").get_text().split(",")
+                if len(pattern.strip()) > 0
+            ],
+            'snapshot_mode': builder.get_object("checkbuttonSnapshotMode").get_active(),
+            'max_sessions':        int(builder.get_object("spinbuttonMaxSessions")      .get_value()),
+            'max_queued_sessions': int(builder.get_object("spinbuttonMaxQueuedSessions").get_value()),
+            'session_filter_rules': [
+                rule.strip() for rule in builder.get_object("entrySessionFilterRules").get_text().split(";")
+                if len(rule.strip()) > 0
+            ],
         })
         self._profile_manager.store_profile(active_profile_name, profile)
 
@@ -101,22 +140,22 @@ class GladeHandler:
     ### SESSION
 
     def onRun(self, button=None):
-        start_new_thread(self._session.run, ())
+        self._session.dispatch("run")
 
     def onRunToEnd(self, button=None):
-        start_new_thread(self._session.run, (True, ))
+        self._session.dispatch("run", True)
 
     def onSessionStop(self, button=None):
-        start_new_thread(self._session.stop, ())
+        self._session.dispatch("stop")
 
     def onStepInto(self, button=None):
-        start_new_thread(self._session.step_into, ())
+        self._session.dispatch("step_into")
 
     def onStepOver(self, button=None):
-        start_new_thread(self._session.step_over, ())
+        self._session.dispatch("step_over")
 
     def onStepOut(self, button=None):
-        start_new_thread(self._session.step_out, ())
+        self._session.dispatch("step_out")
 
     def onClearWatches(self, button=None):
         self._session.clear_watches()
@@ -143,7 +182,7 @@ class GladeHandler:
     def onRemoveWatch(self, button=None):
         builder = self._builder
         treeviewWatches  = builder.get_object("treeviewWatches")
-        treestoreWatches = builder.get_object("treestoreWatches")
+        treestoreWatches = self._getWatchesModel()
 
         selection = treeviewWatches.get_selection()
 
@@ -157,7 +196,7 @@ class GladeHandler:
     def onDuplicateWatch(self, button=None):
         builder = self._builder
         treeviewWatches  = builder.get_object("treeviewWatches")
-        treestoreWatches = builder.get_object("treestoreWatches")
+        treestoreWatches = self._getWatchesModel()
 
         selection = treeviewWatches.get_selection()
 
@@ -171,7 +210,7 @@ class GladeHandler:
     def onEditWatchDefinition(self, button=None):
         builder = self._builder
         treeviewWatches  = builder.get_object("treeviewWatches")
-        treestoreWatches = builder.get_object("treestoreWatches")
+        treestoreWatches = self._getWatchesModel()
 
         selection = treeviewWatches.get_selection()
 
@@ -202,7 +241,7 @@ class GladeHandler:
     def onEditWatch(self, button=None):
         builder = self._builder
         treeviewWatches  = builder.get_object("treeviewWatches")
-        treestoreWatches = builder.get_object("treestoreWatches")
+        treestoreWatches = self._getWatchesModel()
 
         selection = treeviewWatches.get_selection()
 
@@ -212,71 +251,121 @@ class GladeHandler:
             treeIter   = treestoreWatches.get_iter(path)
             fullName   = treestoreWatches.get_value(treeIter, 2)
             value      = treestoreWatches.get_value(treeIter, 1)
+            rowType    = treestoreWatches.get_value(treeIter, 3)
 
-            dialog = Gtk.Dialog("Edit watch", builder.get_object("windowSession"))
-            dialog.add_button(Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL)
-            dialog.add_button(Gtk.STOCK_OK,     Gtk.ResponseType.OK)
-            dialogBox = dialog.get_content_area()
+            # truncated values are completed before they can be edited
+            self._plugin.run_in_worker(self.__loadWatchForEditing, fullName, value, rowType)
 
-            typeListStore = Gtk.ListStore(str)
-            types = []
-            for typeName, typeType, typeXsiType in self._session.get_types():
-                treeIter = typeListStore.append()
-                typeListStore.set_value(treeIter, 0, typeName)
-                types.append(typeName)
+    def __loadWatchForEditing(self, fullName, value, rowType):
+        if self._session.is_truncated(fullName):
+            value = self._session.get_full_value(fullName, rowType)
+            if value == None:
+                # saving the shortened value would cut off the real one
+                GLib.idle_add(self.__showEditWatchFailed, fullName)
+                return
+        GLib.idle_add(self.__showEditWatchDialog, fullName, value)
 
-            cellRenderer = Gtk.CellRendererText()
+    def __showEditWatchFailed(self, fullName):
+        builder = self._builder
+        if builder == None:
+            return False # the window was given to another session meanwhile
+        dialog = Gtk.MessageDialog(
+            builder.get_object("windowSession"),
+            Gtk.DialogFlags.MODAL,
+            Gtk.MessageType.ERROR,
+            Gtk.ButtonsType.CLOSE,
+            "The full value of '" + fullName + "' could not be loaded, the shortened value cannot be edited."
+        )
+        dialog.run()
+        dialog.destroy()
+        return False
 
-            labelFullName = Gtk.Label()
-            labelFullName.set_text(fullName)
+    def __showEditWatchDialog(self, fullName, value):
+        builder = self._builder
+        if builder == None:
+            return False # the window was given to another session meanwhile
+        dialog = Gtk.Dialog("Edit watch", builder.get_object("windowSession"))
+        dialog.add_button(Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL)
+        dialog.add_button(Gtk.STOCK_OK,     Gtk.ResponseType.OK)
+        dialogBox = dialog.get_content_area()
 
-            typeComboBox = Gtk.ComboBox()
-            typeComboBox.set_model(typeListStore)
-            typeComboBox.pack_start(cellRenderer, True)
-            typeComboBox.add_attribute(cellRenderer, "text", 0)
-            typeComboBox.set_active(0)
+        typeListStore = Gtk.ListStore(str)
+        types = []
+        for typeName, typeType, typeXsiType in self._session.get_types():
+            treeIter = typeListStore.append()
+            typeListStore.set_value(treeIter, 0, typeName)
+            types.append(typeName)
 
-            userEntryTextBuffer = Gtk.TextBuffer()
-            userEntryTextBuffer.set_text(value)
+        cellRenderer = Gtk.CellRendererText()
 
-            userEntryTextView = Gtk.TextView()
-            userEntryTextView.set_buffer(userEntryTextBuffer)
+        labelFullName = Gtk.Label()
+        labelFullName.set_text(fullName)
 
-            dialogBox.pack_start(labelFullName,     False, False, 0)
-            dialogBox.pack_start(typeComboBox,      False, False, 0)
-            dialogBox.pack_start(userEntryTextView, False, False, 0)
+        typeComboBox = Gtk.ComboBox()
+        typeComboBox.set_model(typeListStore)
+        typeComboBox.pack_start(cellRenderer, True)
+        typeComboBox.add_attribute(cellRenderer, "text", 0)
+        typeComboBox.set_active(0)
 
-            dialog.show_all()
-            response = dialog.run()
+        userEntryTextBuffer = Gtk.TextBuffer()
+        userEntryTextBuffer.set_text(value)
 
-            if response == Gtk.ResponseType.OK:
-                start = userEntryTextBuffer.get_start_iter()
-                end = userEntryTextBuffer.get_end_iter()
-                newValue = userEntryTextBuffer.get_text(start, end, True)
-                newType = types[typeComboBox.get_active()]
+        userEntryTextView = Gtk.TextView()
+        userEntryTextView.set_buffer(userEntryTextBuffer)
 
-                if newValue != '':
-                    self._session.set_property(fullName, newType, newValue)
-            dialog.destroy()
+        dialogBox.pack_start(labelFullName,     False, False, 0)
+        dialogBox.pack_start(typeComboBox,      False, False, 0)
+        dialogBox.pack_start(userEntryTextView, False, False, 0)
+
+        dialog.show_all()
+        response = dialog.run()
+
+        if response == Gtk.ResponseType.OK:
+            start = userEntryTextBuffer.get_start_iter()
+            end = userEntryTextBuffer.get_end_iter()
+            newValue = userEntryTextBuffer.get_text(start, end, True)
+            newType = types[typeComboBox.get_active()]
+
+            if newValue != '':
+                self._plugin.run_in_worker(self._session.set_property, fullName, newType, newValue)
+        dialog.destroy()
+        return False
 
     def onWatchExpanded(self, treeView=None, treeIter=None, treePath=None, userData=None):
         builder = self._builder
         treeviewWatches  = builder.get_object("treeviewWatches")
-        treestoreWatches = builder.get_object("treestoreWatches")
+        treestoreWatches = self._getWatchesModel()
 
         fullName = treestoreWatches.get_value(treeIter, 2)
         rowType = treestoreWatches.get_value(treeIter, 3)
-        if rowType == "watch":
-            self._session.expand_watch(fullName)
+        self._expanded_watches = self._expanded_watches | {fullName}
+        if self._is_restoring_watches:
+            pass # re-expanded after the model was detached, the children are already there
+        elif rowType == "watch":
+            self._plugin.run_in_worker(self._session.expand_watch, fullName)
         else:
-            self._session.expand_property(fullName)
+            self._plugin.run_in_worker(self._session.expand_property, fullName)
+
+    def onWatchActivated(self, treeView=None, treePath=None, treeViewColumn=None, userData=None):
+        builder = self._builder
+        treestoreWatches = self._getWatchesModel()
+
+        treeIter = treestoreWatches.get_iter(treePath)
+        rowType = treestoreWatches.get_value(treeIter, 3)
+        if rowType == "more":
+            fullName = treestoreWatches.get_value(treeIter, 2)
+            if fullName in self._watches_load_more:
+                rowIter, page, propertyType = self._watches_load_more.pop(fullName)
+                treestoreWatches.remove(rowIter)
+                self._plugin.run_in_worker(self._session.load_property_page, fullName, page, propertyType)
 
     def onWatchCollapsed(self, treeView=None, treeIter=None, treePath=None, userData=None):
         builder = self._builder
         treeviewWatches  = builder.get_object("treeviewWatches")
-        treestoreWatches = builder.get_object("treestoreWatches")
+        treestoreWatches = self._getWatchesModel()
 
         fullName = treestoreWatches.get_value(treeIter, 2)
+        self._expanded_watches = self._expanded_watches - {fullName}
         self._session.collapse_watch(fullName)
 
     def onWatchButtonPress(self, treeView=None, event=None, userData=None):
@@ -302,105 +391,369 @@ class GladeHandler:
 
         self._session.open_uri_resouce(uri, int(lineNr))
 
-    def getWatchesScrollPosition(self):
-        builder = self._builder
-        scrolledWindow = builder.get_object("scrolledwindowWatches")
-
-        top  = scrolledWindow.get_vadjustment().get_value()
-        left = scrolledWindow.get_hadjustment().get_value()
-
-        return [top, left]
-
-    def setWatchesScrollPosition(self, positions):
-        GLib.idle_add(self._do_setWatchesScrollPosition, positions)
+    def setRunningState(self, isRunning):
+        self.__queueOperation(self._do_setRunningState, isRunning)
 
-    def _do_setWatchesScrollPosition(self, positions):
+    def _do_setRunningState(self, isRunning):
+        # while the engine runs, only 'stop' makes sense
         builder = self._builder
-        scrolledWindow = builder.get_object("scrolledwindowWatches")
-
-        top, left = positions
-
-        scrolledWindow.get_vadjustment().set_value(top)
-        scrolledWindow.get_hadjustment().set_value(left)
+        for buttonId in ["buttonStepInto", "buttonStepOver", "buttonStepOut", "buttonRun", "buttonRunToEnd"]:
+            builder.get_object(buttonId).set_sensitive(not isRunning)
+        window = builder.get_object("windowSession")
+        title = window.get_title()
+        if title == None:
+            title = ""
+        runningSuffix = " (running…)"
+        if title.endswith(runningSuffix):
+            title = title[:-len(runningSuffix)]
+        if isRunning:
+            title += runningSuffix
+        window.set_title(title)
+
+    def updateSessionStatistics(self, handshakeStatistics, stepStatistics=None):
+        self.__queueOperation(self._do_updateSessionStatistics, handshakeStatistics, stepStatistics)
+
+    def _do_updateSessionStatistics(self, handshakeStatistics, stepStatistics):
+        parts = []
+        if handshakeStatistics != None:
+            parts.append("Handshake: %d commands, %d round-trip(s), %.1f ms" % (
+                handshakeStatistics['commands'],
+                handshakeStatistics['round_trips'],
+                handshakeStatistics['duration'] * 1000
+            ))
+        if stepStatistics != None:
+            parts.append("Last step: %d round-trip(s), rendered after %.1f ms" % (
+                stepStatistics['round_trips'],
+                stepStatistics['duration'] * 1000
+            ))
+        self._builder.get_object("labelSessionStatistics").set_text("    ".join(parts))
+
+    ### UI OPERATION QUEUE
+
+    # All updates of the session-window coming from other threads are queued here and applied in
+    # bulk by one idle-callback, instead of scheduling one main-loop callback per operation.
+
+    def __queueOperation(self, callback, *arguments):
+        with self._ui_lock:
+            if self._builder == None:
+                return # the window was given to another session
+            self._ui_operations.append((callback, arguments))
+            if not self._is_flush_scheduled:
+                self._is_flush_scheduled = True
+                GLib.idle_add(self._do_flushOperations)
+
+    def _do_flushOperations(self):
+        begin = time.perf_counter()
+        with self._ui_lock:
+            operations = self._ui_operations
+            self._ui_operations = deque()
+            self._is_flush_scheduled = False
+        for callback, arguments in operations:
+            try:
+                callback(*arguments)
+            except Exception:
+                traceback.print_exc()
+        statistics = self._ui_step_current
+        statistics['operations'] += len(operations)
+        statistics['flushes']    += 1
+        statistics['duration']   += time.perf_counter() - begin
+        return False
+
+    def detachFromWindow(self):
+        # main-loop only: the (pooled) window goes to another session, pending operations are dropped
+        with self._ui_lock:
+            self._builder = None
+            self._ui_operations = deque()
+
+    def __finishStep(self):
+        # called (as an operation) after the complete update of one step
+        self._ui_step_statistics = self._ui_step_current
+        self.__resetStepStatistics()
+        logger.debug(
+            "UI update: %d operations in %d main-loop callbacks, %.1f ms",
+            self._ui_step_statistics['operations'],
+            self._ui_step_statistics['flushes'],
+            self._ui_step_statistics['duration'] * 1000
+        )
+
+    def __resetStepStatistics(self):
+        self._ui_step_current = {'operations': 0, 'flushes': 0, 'duration': 0.0}
+
+    def callWhenUpdated(self, callback, *arguments):
+        # calls back on the main thread once all updates queued so far are applied
+        self.__queueOperation(callback, *arguments)
+
+    def getUiStepStatistics(self):
+        # main-loop time spent for the last step, see __finishStep
+        return self._ui_step_statistics
+
+    ### WATCHES
+
+    def _getWatchesModel(self):
+        if self._watches_model == None:
+            self._watches_model = WatchesTreeModel()
+            self._builder.get_object("treeviewWatches").set_model(self._watches_model)
+        return self._watches_model
+
+    def getExpandedWatches(self):
+        # may be called from any thread, the set is never modified but replaced
+        return self._expanded_watches
 
     def clearWatches(self):
-        GLib.idle_add(self._do_clearWatches)
+        self.__queueOperation(self._do_clearWatches)
 
     def _do_clearWatches(self):
         builder = self._builder
-        treestoreWatches = builder.get_object("treestoreWatches")
+        treestoreWatches = self._getWatchesModel()
         treestoreWatches.clear()
         self._watches = {}
         self._watches_placeholder = {}
+        self._watches_load_more = {}
+        self._watch_values = {}
+        self._watch_parents = {}
+
+    def updateWatches(self, rows):
+        # 'rows' is the complete new state: rows missing in it are removed, changed values highlighted
+        self.__queueOperation(self._do_updateWatches, rows, True)
+        self.__queueOperation(self.__finishStep)
+
+    def mergeWatches(self, rows):
+        # 'rows' only adds to the current state (e.g. the children of an expanded row)
+        self.__queueOperation(self._do_updateWatches, rows, False)
+
+    def _do_updateWatches(self, rows, isComplete):
+        # Each row is one of:
+        #  ['row',         fullName, title, value, parentFullName, rowType]
+        #  ['placeholder', parentFullName]
+        #  ['more',        parentFullName, page, remainingCount, rowType]
+        builder = self._builder
+        treestoreWatches = self._getWatchesModel()
+        treeviewWatches  = builder.get_object("treeviewWatches")
 
-    def addWatchRow(self, fullName=None, title=None, value=None, parentFullName=None, rowType="property"):
-        GLib.idle_add(self._do_addWatchRow, fullName, title, value, parentFullName, rowType)
-
-    def _do_addWatchRow(self, fullName=None, title=None, value=None, parentFullName=None, rowType="property"):
-        if fullName not in self._watches or fullName is None:
-            parentIter = None
-            if parentFullName != None:
-                parentIter = self._watches[parentFullName]
-
-            builder = self._builder
-            treestoreWatches = builder.get_object("treestoreWatches")
-
-            if fullName != None:
-                rowIter = treestoreWatches.append(parentIter)
-                self._watches[fullName] = rowIter
-                treestoreWatches.set_value(rowIter, 0, title)
-                treestoreWatches.set_value(rowIter, 1, value)
-                treestoreWatches.set_value(rowIter, 2, fullName)
-                treestoreWatches.set_value(rowIter, 3, rowType)
-                if parentFullName in self._watches_placeholder:
-                    treestoreWatches.remove(self._watches_placeholder[parentFullName])
+        # every inserted row would otherwise be laid out by the view right away
+        insertCount = 0
+        for row in rows:
+            if row[0] == 'row' and row[1] not in self._watches:
+                insertCount += 1
+        isDetached = insertCount > WATCHES_DETACH_THRESHOLD
+        if isDetached:
+            scrollPosition = self.__getWatchesScrollPosition()
+            treeviewWatches.set_model(None)
+            treestoreWatches.set_silent(True)
+
+        fullNames = set()
+        parentsWithChildren = set()
+        placeholderParents = set()
+        loadMoreParents = set()
+
+        # Insert and update first, so that expanded rows never lose all their children in between
+        # (which would collapse them).
+        for row in rows:
+            if row[0] == 'row':
+                kind, fullName, title, value, parentFullName, rowType = row
+                fullNames.add(fullName)
+                parentsWithChildren.add(parentFullName)
+
+                if fullName in self._watches:
+                    rowIter = self._watches[fullName]
+                    if title != None:
+                        treestoreWatches.set_value(rowIter, 0, title)
+                    if self._watch_values[fullName] != value:
+                        treestoreWatches.set_value(rowIter, 1, value)
+                        self._watch_values[fullName] = value
+                        if isComplete:
+                            treestoreWatches.set_value(rowIter, 4, Pango.Weight.BOLD)
+                    elif isComplete:
+                        treestoreWatches.set_value(rowIter, 4, Pango.Weight.NORMAL)
+
+                elif title == None:
+                    pass # only meant to update the value of a row that is gone by now
+
+                elif parentFullName == None or parentFullName in self._watches:
+                    parentIter = None
+                    if parentFullName != None:
+                        parentIter = self._watches[parentFullName]
+                    rowIter = treestoreWatches.append(parentIter)
+                    treestoreWatches.set(rowIter, [0, 1, 2, 3, 4], [title, value, fullName, rowType, Pango.Weight.NORMAL])
+                    self._watches[fullName] = rowIter
+                    self._watch_values[fullName] = value
+                    self._watch_parents[fullName] = parentFullName
+                    if parentFullName in self._watches_placeholder:
+                        treestoreWatches.remove(self._watches_placeholder.pop(parentFullName))
+
+            elif row[0] == 'placeholder':
+                placeholderParents.add(row[1])
+
+            elif row[0] == 'more':
+                kind, parentFullName, page, remainingCount, rowType = row
+                loadMoreParents.add(parentFullName)
+                self.__setWatchLoadMoreRow(parentFullName, page, remainingCount, rowType)
+
+        if isComplete:
+            # rows whose parent gets removed vanish together with their parent
+            removedFullNames = set(self._watches.keys()) - fullNames
+            removedIters = []
+            for fullName in removedFullNames:
+                rowIter = self._watches.pop(fullName)
+                if self._watch_parents[fullName] not in removedFullNames:
+                    removedIters.append(rowIter)
+                del self._watch_values[fullName]
+                del self._watch_parents[fullName]
+            treestoreWatches.remove_all(removedIters)
+
+            for parentFullName in list(self._watches_placeholder.keys()):
+                if parentFullName in removedFullNames:
                     del self._watches_placeholder[parentFullName]
-
-            elif parentFullName not in self._watches_placeholder:
-                rowIter = treestoreWatches.append(parentIter)
-                self._watches_placeholder[parentFullName] = rowIter
-
-    def setWatchRowValue(self, fullName, value):
-        GLib.idle_add(self._do_setWatchRowValue, fullName, value)
-
-    def _do_setWatchRowValue(self, fullName, value):
+                elif parentFullName in parentsWithChildren or parentFullName not in placeholderParents:
+                    treestoreWatches.remove(self._watches_placeholder.pop(parentFullName))
+
+            for parentFullName in list(self._watches_load_more.keys()):
+                if parentFullName in removedFullNames:
+                    del self._watches_load_more[parentFullName]
+                elif parentFullName not in loadMoreParents:
+                    treestoreWatches.remove(self._watches_load_more.pop(parentFullName)[0])
+
+        # placeholders (which make a row expandable) only go into rows that have no children otherwise
+        for parentFullName in placeholderParents:
+            if parentFullName in self._watches and parentFullName not in self._watches_placeholder:
+                parentIter = self._watches[parentFullName]
+                if not treestoreWatches.iter_has_child(parentIter):
+                    rowIter = treestoreWatches.append(parentIter)
+                    treestoreWatches.set_value(rowIter, 4, Pango.Weight.NORMAL)
+                    self._watches_placeholder[parentFullName] = rowIter
+
+        if isDetached:
+            treestoreWatches.set_silent(False)
+            treeviewWatches.set_model(treestoreWatches)
+            self.__restoreExpandedWatches()
+            # the view needs to be laid out again before it can be scrolled
+            GLib.idle_add(self.__setWatchesScrollPosition, scrollPosition, priority=GLib.PRIORITY_LOW)
+
+    def __restoreExpandedWatches(self):
         builder = self._builder
-        treestoreWatches = builder.get_object("treestoreWatches")
-        rowIter = self._watches[fullName]
-        treestoreWatches.set_value(rowIter, 1, value)
-
-    def expandWatchRow(self, fullName):
-        GLib.idle_add(self._do_expandWatchRow, fullName)
+        treeviewWatches  = builder.get_object("treeviewWatches")
+        treestoreWatches = self._getWatchesModel()
+        rowPaths = []
+        for fullName in self._expanded_watches:
+            if fullName in self._watches:
+                rowPaths.append(treestoreWatches.get_path(self._watches[fullName]))
+        rowPaths.sort(key=lambda rowPath: rowPath.get_depth()) # parents first
+        self._is_restoring_watches = True
+        try:
+            for rowPath in rowPaths:
+                treeviewWatches.expand_row(rowPath, False)
+        finally:
+            self._is_restoring_watches = False
+
+    def __getWatchesScrollPosition(self):
+        scrolledWindow = self._builder.get_object("scrolledwindowWatches")
+        return [scrolledWindow.get_vadjustment().get_value(), scrolledWindow.get_hadjustment().get_value()]
+
+    def __setWatchesScrollPosition(self, scrollPosition):
+        if self._builder == None:
+            return False # the window was given to another session meanwhile
+        scrolledWindow = self._builder.get_object("scrolledwindowWatches")
+        top, left = scrollPosition
+        scrolledWindow.get_vadjustment().set_value(top)
+        scrolledWindow.get_hadjustment().set_value(left)
+        return False
 
-    def _do_expandWatchRow(self, fullName):
+    def __setWatchLoadMoreRow(self, parentFullName, page, remainingCount, rowType="property"):
+        # activating this row fetches the next page of children
+        if parentFullName in self._watches:
+            builder = self._builder
+            treestoreWatches = self._getWatchesModel()
+            if parentFullName in self._watches_load_more:
+                rowIter = self._watches_load_more[parentFullName][0]
+                treestoreWatches.move_to_end(rowIter) # keep it below the rows of the page
+            else:
+                rowIter = treestoreWatches.append(self._watches[parentFullName])
+            treestoreWatches.set(rowIter, [0, 1, 2, 3, 4], [
+                "... load more (" + str(remainingCount) + " remaining)",
+                "",
+                parentFullName,
+                "more",
+                Pango.Weight.NORMAL
+            ])
+            self._watches_load_more[parentFullName] = (rowIter, page, rowType)
+
+    def updateStack(self, stackRows):
+        self.__queueOperation(self._do_updateStack, stackRows)
+
+    def _do_updateStack(self, stackRows):
+        # only the rows that differ from the last state are touched
         builder = self._builder
-        treeviewWatches = builder.get_object("treeviewWatches")
-        treestoreWatches = builder.get_object("treestoreWatches")
-        rowIter = self._watches[fullName]
-        rowPath = treestoreWatches.get_path(rowIter)
-        treeviewWatches.expand_row(rowPath, False)
+        liststoreStack = builder.get_object("liststoreStack")
+        rowIter = liststoreStack.get_iter_first()
+        for filepath, line, where in stackRows:
+            if rowIter == None:
+                rowIter = liststoreStack.append()
+            filename = filepath.split("/")[-1]
+            if liststoreStack.get(rowIter, 0, 1, 2) != (filepath, line, where):
+                liststoreStack.set(rowIter, [0, 1, 2, 3], [filepath, line, where, filename])
+            rowIter = liststoreStack.iter_next(rowIter)
+        while rowIter != None:
+            if not liststoreStack.remove(rowIter):
+                rowIter = None
 
     def clearStack(self):
-        GLib.idle_add(self._do_clearStack)
+        self.__queueOperation(self._do_clearStack)
 
     def _do_clearStack(self):
         builder = self._builder
         liststoreStack = builder.get_object("liststoreStack")
         liststoreStack.clear()
 
-    def addStackRow(self, filepath, line, where):
-        GLib.idle_add(self._do_addStackRow, filepath, line, where)
+    ### SESSION COUNTERS
 
-    def _do_addStackRow(self, filepath, line, where):
+    def updateSessionCounters(self, statistics, windowStatistics):
         builder = self._builder
-        liststoreStack = builder.get_object("liststoreStack")
-        rowIter = liststoreStack.append()
-        filename = filepath.split("/")[-1]
-        liststoreStack.set_value(rowIter, 0, filepath)
-        liststoreStack.set_value(rowIter, 1, line)
-        liststoreStack.set_value(rowIter, 2, where)
-        liststoreStack.set_value(rowIter, 3, filename)
-
+        for name, key in [
+            ("Attached",  'attached'),
+            ("Queued",    'queued'),
+            ("Accepted",  'accepted'),
+            ("Detached",  'detached'),
+            ("Abandoned", 'abandoned'),
+            ("Filtered",  'filtered'),
+        ]:
+            builder.get_object("labelSessionCounter" + name + "Value").set_text(str(statistics[key]))
+        builder.get_object("labelSessionCounterWaitValue").set_text("%.1f s / %.1f s" % (
+            statistics['wait_average'],
+            statistics['wait_max']
+        ))
+        builder.get_object("labelSessionCounterWindowsValue").set_text("%d / %d (%d built)" % (
+            windowStatistics['live'],
+            windowStatistics['idle'],
+            windowStatistics['created']
+        ))
+        timeToWindow = "-"
+        if windowStatistics['time_to_window'] != None:
+            timeToWindow = "%.1f ms" % (windowStatistics['time_to_window'] * 1000)
+        builder.get_object("labelSessionCounterTimeToWindowValue").set_text(timeToWindow)
+
+    ### SNAPSHOTS
+
+    def onSnapshotSelected(self, treeView=None):
+        selection = treeView.get_selection()
+        store, treeIter = selection.get_selected()
+        if treeIter != None:
+            self._session.show_snapshot(store.get_value(treeIter, 0))
+
+    ### LOG
+
+    def appendLog(self, line):
+        self.__queueOperation(self._do_appendLog, line)
+
+    def _do_appendLog(self, line):
+        builder = self._builder
+        textBuffer = builder.get_object("textviewLog").get_buffer()
+        textBuffer.insert(textBuffer.get_end_iter(), line + "\n")
+        lineCount = textBuffer.get_line_count() - 1
+        if lineCount > LOG_MAX_LINES:
+            textBuffer.delete(textBuffer.get_start_iter(), textBuffer.get_iter_at_line(lineCount - LOG_MAX_LINES))
+        expanderLog = builder.get_object("expanderLog")
+        if lineCount == 1:
+            expanderLog.set_expanded(True)
 
     ### PATH MAPPING
 
@@ -517,3 +870,47 @@ class GladeHandler:
 
         self._plugin.set_breakpoint_condition(filePath, line, None)
         menuBreakpoints.addiks_gutter.queue_draw() # force redraw
+
+    def onBreakpointSetLog(self, menuItem=None, userData=None):
+        builder = self._builder
+
+        menuBreakpoints = builder.get_object("menuBreakpoints")
+
+        window = menuBreakpoints.addiks_window
+        filePath = menuBreakpoints.addiks_filePath
+        line = menuBreakpoints.addiks_line
+        expressions = self._plugin.get_breakpoint_log(filePath, line)
+
+        dialog = Gtk.Dialog("Log expressions (one per line) and continue", window)
+        dialog.add_button(Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL)
+        dialog.add_button(Gtk.STOCK_OK, Gtk.ResponseType.OK)
+        dialog.set_default_size(400, 150)
+        dialogBox = dialog.get_content_area()
+
+        expressionsView = Gtk.TextView()
+        expressionsView.set_monospace(True)
+        expressionsView.get_buffer().set_text("\n".join(expressions))
+
+        dialogBox.pack_end(expressionsView, True, True, 0)
+
+        dialog.show_all()
+        response = dialog.run()
+        textBuffer = expressionsView.get_buffer()
+        text = textBuffer.get_text(textBuffer.get_start_iter(), textBuffer.get_end_iter(), False)
+        dialog.destroy()
+
+        if response == Gtk.ResponseType.OK:
+            expressions = [expression.strip() for expression in text.split("\n")]
+            self._plugin.set_breakpoint_log(filePath, line, [expression for expression in expressions if expression != ''])
+            menuBreakpoints.addiks_gutter.queue_draw() # force redraw
+
+    def onBreakpointRemoveLog(self, menuItem=None, userData=None):
+        builder = self._builder
+
+        menuBreakpoints = builder.get_object("menuBreakpoints")
+
+        filePath = menuBreakpoints.addiks_filePath
+        line = menuBreakpoints.addiks_line
+
+        self._plugin.set_breakpoint_log(filePath, line, [])
+        menuBreakpoints.addiks_gutter.queue_draw() # force redraw
@@ -0,0 +1,99 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import socket
+import xml.etree.ElementTree as ElementTree
+
+# Reads DBGp frames ("<length>\0<xml>\0") from a socket.
+#
+# All data is received into one growable buffer using recv_into, complete frames are handed to the
+# XML parser as memoryview slices of that buffer. The payload is decoded exactly once (by expat), so
+# multibyte characters that are split across two recv calls do not get corrupted.
+class PacketReader:
+
+    def __init__(self, clientSocket, initialSize=65536):
+        self._socket = clientSocket
+        self._buffer = bytearray(initialSize)
+        self._start  = 0 # begin of not yet consumed data
+        self._end    = 0 # end of received data
+
+    def read_packet(self):
+        # blocks until a complete frame was received
+        while True:
+            packet = self.next_packet()
+            if packet is not None:
+                return packet
+            self.receive()
+
+    def receive(self):
+        self.__reserve(4096)
+        with memoryview(self._buffer) as view:
+            receivedSize = self._socket.recv_into(view[self._end:])
+        if receivedSize <= 0:
+            raise socket.error("Connection was closed")
+        self._end += receivedSize
+        return receivedSize
+
+    def next_packet(self):
+        # returns None if more data is needed
+        buffer = self._buffer
+        nullBytePosition = buffer.find(b"\0", self._start, self._end)
+        if nullBytePosition < 0:
+            return None
+
+        xmlBegin = nullBytePosition + 1
+        xmlEnd   = xmlBegin + int(buffer[self._start:nullBytePosition])
+
+        if xmlEnd >= self._end: # the terminating null-byte is not here yet
+            self.__reserve(xmlEnd + 1 - self._end)
+            return None
+
+        parser = ElementTree.XMLParser(encoding="utf-8")
+        with memoryview(buffer) as view:
+            with view[xmlBegin:xmlEnd] as xmlData:
+                parser.feed(xmlData)
+        root = parser.close()
+
+        self._start = xmlEnd + 1
+        if self._start == self._end:
+            self._start = 0
+            self._end   = 0
+
+        return root
+
+    def has_buffered_data(self):
+        return self._end > self._start
+
+    def __reserve(self, size):
+        # make sure there are at least 'size' free bytes after the received data
+        if len(self._buffer) - self._end >= size:
+            return
+
+        pendingSize = self._end - self._start
+        newSize = len(self._buffer)
+        while newSize - pendingSize < size:
+            newSize *= 2
+
+        if newSize == len(self._buffer):
+            # enough space in front of the data, just move it to the beginning
+            self._buffer[0:pendingSize] = self._buffer[self._start:self._end]
+        else:
+            newBuffer = bytearray(newSize)
+            newBuffer[0:pendingSize] = self._buffer[self._start:self._end]
+            self._buffer = newBuffer
+
+        self._start = 0
+        self._end   = pendingSize
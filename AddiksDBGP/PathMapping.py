@@ -0,0 +1,78 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import csv
+import threading
+
+# The path-mappings (local path => remote path) of one profile, without any GTK.
+#
+# The CSV-file is read once, on first use, and the mappings then stay in memory. Sessions map paths
+# from their workers while the path-mapping window may change the mappings on the main-loop.
+class PathMapping:
+
+    def __init__(self, filePath):
+        self._file_path = filePath
+        self._mapped_paths = None
+        self._lock = threading.Lock()
+
+    def mapLocalToRemote(self, localPathToMap):
+        for localPath, remotePath in self.get_mappings():
+            if localPathToMap.startswith(localPath):
+                appendix = localPathToMap[len(localPath):]
+                localPathToMap = remotePath + appendix
+        return localPathToMap
+
+    def mapRemoteToLocal(self, remotePathToMap):
+        for localPath, remotePath in self.get_mappings():
+            if remotePathToMap.startswith(remotePath):
+                appendix = remotePathToMap[len(remotePath):]
+                remotePathToMap = localPath + appendix
+        return remotePathToMap
+
+    def get_mappings(self):
+        # list of (local path, remote path)
+        with self._lock:
+            return list(self.__get_mapped_paths().items())
+
+    def add_path_mapping(self, localPath, remotePath):
+        with self._lock:
+            self.__get_mapped_paths()[localPath] = remotePath
+            self.__save()
+
+    def remove_path_mapping(self, localPath):
+        with self._lock:
+            self.__get_mapped_paths().pop(localPath, None)
+            self.__save()
+
+    def __get_mapped_paths(self):
+        if self._mapped_paths == None:
+            self._mapped_paths = {}
+            if os.path.exists(self._file_path):
+                with open(self._file_path, "r") as fileHandle:
+                    for row in csv.reader(fileHandle, delimiter=","):
+                        if len(row) == 2:
+                            self._mapped_paths[row[0]] = row[1]
+        return self._mapped_paths
+
+    def __save(self):
+        directory = os.path.dirname(self._file_path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(self._file_path, "w") as fileHandle:
+            writer = csv.writer(fileHandle, delimiter=",")
+            for localPath, remotePath in self._mapped_paths.items():
+                writer.writerow([localPath, remotePath])
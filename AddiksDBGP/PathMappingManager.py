@@ -14,87 +14,48 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import csv
-import os
-from gi.repository import Gtk, Gdk
-from AddiksDBGP.helpers import file_put_contents
+from gi.repository import Gtk
 from AddiksDBGP.GladeHandler import GladeHandler
+from AddiksDBGP.UiResources import load_ui_component
 
+# The path-mapping window of a profile. The mappings themselves are kept by a PathMapping, the window
+# is only built once it gets shown.
 class PathMappingManager:
 
-    def __init__(self, plugin, profile_name):
+    def __init__(self, plugin, pathMapping):
         self._plugin = plugin
         self._glade_builder = None
-        self._profile_name = profile_name
-        self._mapped_paths = {}
-        self.load()
+        self._glade_handler = None
+        self._path_mapping = pathMapping
 
-    def mapLocalToRemote(self, localPathToMap):
-        for localPath in self._mapped_paths:
-            remotePath = self._mapped_paths[localPath]
-            if localPathToMap.startswith(localPath):
-                appendix = localPathToMap[len(localPath):]
-                localPathToMap = remotePath + appendix
-        return localPathToMap
-
-    def mapRemoteToLocal(self, remotePathToMap):
-        for localPath in self._mapped_paths:
-            remotePath = self._mapped_paths[localPath]
-            if remotePathToMap.startswith(remotePath):
-                appendix = remotePathToMap[len(remotePath):]
-                remotePathToMap = localPath + appendix
-        return remotePathToMap
+    def get_path_mapping(self):
+        return self._path_mapping
 
     def show(self):
         builder = self._getGladeBuilder()
+        self.__update_list()
         window = builder.get_object("windowPathmapping")
         window.show_all()
 
     def add_path_mapping(self, localPath, remotePath):
-        self._mapped_paths[localPath] = remotePath
-        self.save()
+        self._path_mapping.add_path_mapping(localPath, remotePath)
+        self.__update_list()
 
     def remove_path_mapping(self, localPath, remotePath):
-        if localPath in self._mapped_paths:
-            del self._mapped_paths[localPath]
-        self.save()
-
-    def load(self):
-        builder = self._getGladeBuilder()
-        treeviewPathmapping  = builder.get_object("treeviewPathmapping")
-        liststorePathmapping = builder.get_object("liststorePathmapping")
-        liststorePathmapping.clear()
+        self._path_mapping.remove_path_mapping(localPath)
+        self.__update_list()
 
-        fileHandle = open(self.__get_container_file(), "r")
-        reader = csv.reader(fileHandle, delimiter=",")
-        for localPath, remotePath in reader:
-            self._mapped_paths[localPath] = remotePath
-
-            rowIter = liststorePathmapping.append()
-            liststorePathmapping.set_value(rowIter, 0, localPath)
-            liststorePathmapping.set_value(rowIter, 1, remotePath)
-        fileHandle.close()
-        
-    def save(self):
-        fileHandle = open(self.__get_container_file(), "w")
-        writer = csv.writer(fileHandle, delimiter=",")
-        for localPath in self._mapped_paths:
-            remotePath = self._mapped_paths[localPath]
-            writer.writerow([localPath, remotePath])
-        fileHandle.close()
-        self.load()
-
-    def __get_container_file(self):
-        filePath = self._plugin.get_data_dir() + "/path_mapping/" + self._profile_name + ".csv"
-        if not os.path.exists(filePath):
-            file_put_contents(filePath, "")
-        return filePath
+    def __update_list(self):
+        if self._glade_builder != None:
+            liststorePathmapping = self._glade_builder.get_object("liststorePathmapping")
+            liststorePathmapping.clear()
+            for localPath, remotePath in self._path_mapping.get_mappings():
+                liststorePathmapping.append([localPath, remotePath])
 
     def _getGladeBuilder(self):
         if self._glade_builder == None:
             self._glade_builder = Gtk.Builder()
             self._glade_handler = GladeHandler(self._plugin, self._glade_builder, path_mapping_manager=self)
-            self._glade_builder.add_from_file(os.path.dirname(__file__)+"/../addiks-dbgp.glade")
+            load_ui_component(self._glade_builder, "pathmapping")
             self._glade_builder.connect_signals(self._glade_handler)
         return self._glade_builder
-
@@ -0,0 +1,73 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import socket
+
+# Listens on any number of ports for incoming DBGp connections.
+#
+# All listening sockets are non-blocking and registered with the socket-loop, connections are
+# accepted as soon as they arrive (as many as are pending) and handed to the accept-callback.
+# Closing the listener takes effect immediately, there is no polling involved.
+class PortListener:
+
+    def __init__(self, socketLoop, acceptCallback, host="0.0.0.0", backlog=socket.SOMAXCONN):
+        self._socket_loop = socketLoop
+        self._accept_callback = acceptCallback
+        self._host = host
+        self._backlog = backlog
+        self._listening_sockets = {}
+
+    def listen(self, port):
+        port = int(port)
+        if port in self._listening_sockets:
+            return port
+        listenSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            listenSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listenSocket.bind((self._host, port))
+            listenSocket.listen(self._backlog)
+            listenSocket.setblocking(False)
+        except OSError:
+            listenSocket.close()
+            raise
+        port = listenSocket.getsockname()[1] # in case port 0 was requested
+        self._listening_sockets[port] = listenSocket
+        self._socket_loop.add_reader(listenSocket, self.__on_acceptable)
+        return port
+
+    def get_ports(self):
+        return list(self._listening_sockets.keys())
+
+    def is_listening(self):
+        return len(self._listening_sockets)>0
+
+    def close(self):
+        listeningSockets = self._listening_sockets
+        self._listening_sockets = {}
+        for listenSocket in listeningSockets.values():
+            self._socket_loop.remove_reader(listenSocket)
+            self._socket_loop.call_soon(listenSocket.close)
+
+    def __on_acceptable(self, listenSocket):
+        while True:
+            try:
+                clientSocket, address = listenSocket.accept()
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                break # socket was closed
+            clientSocket.setblocking(True)
+            self._accept_callback(clientSocket, address)
@@ -15,12 +15,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import threading
 from gi.repository import Gtk, Gdk
 from _thread import start_new_thread
 from AddiksDBGP.helpers import *
 from AddiksDBGP.DebugSession import DebugSession
 from AddiksDBGP.GladeHandler import GladeHandler
+from AddiksDBGP.PathMapping import PathMapping
 from AddiksDBGP.PathMappingManager import PathMappingManager
+from AddiksDBGP.UiResources import load_ui_component
 
 class ProfileManager:
     def __init__(self, plugin):
@@ -31,6 +34,8 @@ class ProfileManager:
         self._profile = self.get_profile_defaults()
         self._session = None
         self._path_mapping = {}
+        self._path_mapping_managers = {}
+        self._path_mapping_lock = threading.Lock()
 
     def show(self):
         builder = self._getGladeBuilder()
@@ -67,7 +72,7 @@ class ProfileManager:
         if self._glade_builder == None:
             self._glade_builder = Gtk.Builder()
             self._glade_handler = GladeHandler(self._plugin, self._glade_builder, profile_manager=self)
-            self._glade_builder.add_from_file(os.path.dirname(__file__)+"/../addiks-dbgp.glade")
+            load_ui_component(self._glade_builder, "profiles")
             self._glade_builder.connect_signals(self._glade_handler)
         return self._glade_builder
 
@@ -86,6 +91,11 @@ class ProfileManager:
         builder.get_object("spinbuttonPort")    .set_value( self._profile['port'])
         builder.get_object("spinbuttonDbgpPort").set_value( self._profile['dbgp_port'])
         builder.get_object("checkbuttonUseDbgp").set_active(self._profile['dbgp_active'])
+        builder.get_object("entryStepSkipPatterns").set_text(", ".join(self._profile['step_skip_patterns']))
+        builder.get_object("checkbuttonSnapshotMode").set_active(self._profile['snapshot_mode'])
+        builder.get_object("spinbuttonMaxSessions").set_value(self._profile['max_sessions'])
+        builder.get_object("spinbuttonMaxQueuedSessions").set_value(self._profile['max_queued_sessions'])
+        builder.get_object("entrySessionFilterRules").set_text("; ".join(self._profile['session_filter_rules']))
 
     def get_profile_defaults(self):
         return {
@@ -94,7 +104,12 @@ class ProfileManager:
             'dbgp_active': True,
             'dbgp_host': 'localhost',
             'dbgp_port': 9001,
-            'dbgp_ide_key': 'GEDIT'
+            'dbgp_ide_key': 'GEDIT',
+            'step_skip_patterns': [], # frames matching these are stepped out of on step-into
+            'snapshot_mode': False, # record breakpoint-hits to a file and run on instead of showing them
+            'max_sessions': 4, # attached at once, further sessions wait
+            'max_queued_sessions': 16, # waiting at once, further sessions get detached
+            'session_filter_rules': [], # e.g. "detach fileuri=*/cron/*", see SessionFilter
         }
 
     def store_profile(self, name, profileData={}):
@@ -111,7 +126,8 @@ class ProfileManager:
         path = self.__get_profiles_path()
         filePath = path + "/" + name
         profileData = file_get_contents(filePath)
-        profile = eval(profileData)
+        profile = self.get_profile_defaults() # profiles stored by older versions lack newer options
+        profile.update(eval(profileData))
         return profile
 
     def create_profile(self, name=None):
@@ -151,12 +167,23 @@ class ProfileManager:
             file_put_contents(file_path, "default")
         return file_get_contents(file_path)
 
+    def get_path_mapping(self, profile_name=None):
+        # no GTK in here, sessions call this from their workers
+        if profile_name == None:
+            profile_name = self.get_active_profile()
+        with self._path_mapping_lock:
+            if profile_name not in self._path_mapping:
+                filePath = self._plugin.get_data_dir() + "/path_mapping/" + profile_name + ".csv"
+                self._path_mapping[profile_name] = PathMapping(filePath)
+            return self._path_mapping[profile_name]
+
     def get_pathmapping_manager(self, profile_name=None):
         if profile_name == None:
             profile_name = self.get_active_profile()
-        if profile_name not in self._path_mapping:
-            self._path_mapping[profile_name] = PathMappingManager(self._plugin, profile_name)
-        return self._path_mapping[profile_name]
+        if profile_name not in self._path_mapping_managers:
+            pathMapping = self.get_path_mapping(profile_name)
+            self._path_mapping_managers[profile_name] = PathMappingManager(self._plugin, pathMapping)
+        return self._path_mapping_managers[profile_name]
 
     def __get_active_profile_filepath(self):
         return self._plugin.get_data_dir() + "/active-debug-profile"
@@ -0,0 +1,122 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import logging
+import threading
+from collections import deque
+from AddiksDBGP.SessionFilter import SessionFilter
+
+logger = logging.getLogger(__name__)
+
+# Decides for every new connection (after its init-packet, before anything else) if it gets attached
+# right away, has to wait in a queue or gets detached.
+#
+# First the session-filter rules of the profile may detach the connection or let it run unattended.
+# Every profile may only have 'max_sessions' sessions attached at once. Further connections wait
+# (with their script blocked, which slows a load-test down instead of flooding gedit with windows)
+# until an attached session of the profile ends. Once 'max_queued_sessions' are waiting, new
+# connections get detached, so their scripts run on without a debugger.
+class SessionAdmission:
+
+    def __init__(self, plugin):
+        self._plugin = plugin
+        self._lock = threading.Lock()
+        self._attached = {} # session => profile-name
+        self._queues = {} # profile-name => deque of (session, queued-at)
+        self._counters = {
+            'accepted':  0,
+            'detached':  0,
+            'abandoned': 0, # connections that were closed while waiting
+            'filtered':  0, # detached or run by a session-filter rule
+        }
+        self._wait_times = deque(maxlen=1000)
+
+    def admit(self, session, profileName, profile):
+        # called on a worker with the init-packet of the session already read
+        action = SessionFilter(profile['session_filter_rules']).get_action(session.get_init_attributes())
+        if action != "attach":
+            with self._lock:
+                self._counters['filtered'] += 1
+            if action == "detach":
+                session.detach()
+            else:
+                session.run_unattended()
+            return
+
+        isAttached = False
+        isDetached = False
+        with self._lock:
+            attachedCount = list(self._attached.values()).count(profileName)
+            queue = self._queues.setdefault(profileName, deque())
+            self.__prune_closed(queue)
+            if attachedCount < profile['max_sessions'] and len(queue) <= 0:
+                self.__mark_attached(session, profileName, 0.0)
+                isAttached = True
+            elif len(queue) < profile['max_queued_sessions']:
+                queue.append((session, time.perf_counter()))
+            else:
+                self._counters['detached'] += 1
+                isDetached = True
+
+        if isAttached:
+            self._plugin.attach_session(session)
+        elif isDetached:
+            logger.info("Detached session of profile '%s', too many sessions attached and waiting", profileName)
+            session.detach()
+
+    def release(self, session):
+        # an attached session ended, the next waiting one of its profile (if any) takes its place
+        nextSession = None
+        with self._lock:
+            profileName = self._attached.pop(session, None)
+            queue = self._queues.get(profileName)
+            while queue and nextSession == None:
+                waitingSession, queuedAt = queue.popleft()
+                if waitingSession.is_connection_closed():
+                    self._counters['abandoned'] += 1
+                else:
+                    nextSession = waitingSession
+                    self.__mark_attached(nextSession, profileName, time.perf_counter() - queuedAt)
+        if nextSession != None:
+            self._plugin.run_in_worker(self._plugin.attach_session, nextSession)
+
+    def get_statistics(self):
+        with self._lock:
+            waitTimes = list(self._wait_times)
+            for queue in self._queues.values():
+                self.__prune_closed(queue)
+            statistics = dict(self._counters)
+            statistics['attached'] = len(self._attached)
+            statistics['queued'] = sum(len(queue) for queue in self._queues.values())
+        statistics['wait_average'] = 0.0
+        statistics['wait_max'] = 0.0
+        if len(waitTimes) > 0:
+            statistics['wait_average'] = sum(waitTimes) / len(waitTimes)
+            statistics['wait_max'] = max(waitTimes)
+        return statistics
+
+    def __mark_attached(self, session, profileName, waitTime):
+        self._attached[session] = profileName
+        self._counters['accepted'] += 1
+        self._wait_times.append(waitTime)
+
+    def __prune_closed(self, queue):
+        # connections that were closed while waiting neither count nor take a place in the queue
+        waiting = [entry for entry in queue if not entry[0].is_connection_closed()]
+        self._counters['abandoned'] += len(queue) - len(waiting)
+        queue.clear()
+        queue.extend(waiting)
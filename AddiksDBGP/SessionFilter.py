@@ -0,0 +1,65 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from fnmatch import fnmatchcase
+
+logger = logging.getLogger(__name__)
+
+SESSION_FILTER_ACTIONS = ['attach', 'detach', 'run']
+
+# Attributes of the init-packet rules can match on. 'url' is only there if the engine (or a proxy)
+# sends the request-url as attribute, the <url> child-element of xdebug is the url of xdebug itself.
+SESSION_FILTER_ATTRIBUTES = ['fileuri', 'idekey', 'appid', 'session', 'url']
+
+# Decides by the init-packet alone what happens to a new connection, without sending anything.
+#
+# A rule is an action followed by any number of 'attribute=glob' conditions, all of which must match,
+# e.g. "detach fileuri=*/cron/*" or "run idekey=LOADTEST appid=4*". The first matching rule wins,
+# connections that no rule matches get attached.
+class SessionFilter:
+
+    def __init__(self, rules=[]):
+        self._rules = []
+        for rule in rules:
+            parsedRule = self.__parse_rule(rule)
+            if parsedRule != None:
+                self._rules.append(parsedRule)
+
+    def get_action(self, initAttributes):
+        for action, conditions in self._rules:
+            isMatching = True
+            for attribute, pattern in conditions:
+                if not fnmatchcase(initAttributes.get(attribute, ""), pattern):
+                    isMatching = False
+                    break
+            if isMatching:
+                return action
+        return "attach"
+
+    def __parse_rule(self, rule):
+        parts = rule.split()
+        if len(parts) <= 0 or parts[0] not in SESSION_FILTER_ACTIONS:
+            logger.warning("Ignoring session-filter rule '%s': unknown action", rule)
+            return None
+        conditions = []
+        for condition in parts[1:]:
+            attribute, separator, pattern = condition.partition("=")
+            if separator == "" or attribute not in SESSION_FILTER_ATTRIBUTES:
+                logger.warning("Ignoring session-filter rule '%s': invalid condition '%s'", rule, condition)
+                return None
+            conditions.append((attribute, pattern))
+        return (parts[0], conditions)
@@ -0,0 +1,160 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import logging
+import threading
+from collections import deque
+from gi.repository import Gtk
+from AddiksDBGP.GladeHandler import GladeHandler
+from AddiksDBGP.UiResources import load_ui_component
+
+logger = logging.getLogger(__name__)
+
+# Closed session-windows kept for reuse, further ones are destroyed.
+MAX_IDLE_SESSION_WINDOWS = 2
+
+# Forwards the signals of a pooled window to the GladeHandler of the session currently using it.
+# Gtk.Builder can connect its signals only once, the handlers are looked up by name.
+class SessionWindowSignals:
+
+    def __init__(self):
+        self.handler = None
+
+    def __getattr__(self, name):
+        def forward(*arguments):
+            if self.handler == None:
+                return None # an idle window
+            return getattr(self.handler, name)(*arguments)
+        return forward
+
+class SessionWindow:
+
+    def __init__(self, builder, signals, buildDuration):
+        self.builder = builder
+        self.signals = signals
+        self.handler = None
+        self.build_duration = buildDuration
+        self.is_reused = False
+        self.has_accel_group = False
+        self.is_destroyed = False
+        self.acquired_at = None
+
+    def on_destroy(self, window):
+        self.is_destroyed = True
+
+# Session-windows are not built from the glade-file for every session. A closed window is reset and
+# handed to the next session, every session still gets its own GladeHandler. Only the windows in use
+# (bounded by the session-admission) plus at most MAX_IDLE_SESSION_WINDOWS idle ones are alive.
+class SessionWindowPool:
+
+    def __init__(self, plugin):
+        self._plugin = plugin
+        self._idle_windows = deque()
+        self._lock = threading.Lock()
+        self._statistics = {
+            'created':        0,
+            'reused':         0,
+            'destroyed':      0,
+            'live':           0,
+            'time_to_window': None, # of the last session, in seconds
+        }
+
+    def prewarm(self):
+        # called on the main-loop while idle, so that the first session does not have to wait
+        with self._lock:
+            isEmpty = len(self._idle_windows) <= 0
+        if isEmpty:
+            sessionWindow = self.__build_window()
+            with self._lock:
+                self._idle_windows.append(sessionWindow)
+        return False
+
+    def acquire(self, session):
+        acquiredAt = time.perf_counter()
+        sessionWindow = None
+        with self._lock:
+            if len(self._idle_windows) > 0:
+                sessionWindow = self._idle_windows.popleft()
+                sessionWindow.is_reused = True
+                self._statistics['reused'] += 1
+        if sessionWindow == None:
+            sessionWindow = self.__build_window()
+        sessionWindow.handler = GladeHandler(self._plugin, sessionWindow.builder, session=session)
+        sessionWindow.signals.handler = sessionWindow.handler
+        sessionWindow.acquired_at = acquiredAt
+        return sessionWindow
+
+    def release(self, sessionWindow):
+        # main-loop only
+        sessionWindow.handler.detachFromWindow()
+        sessionWindow.handler = None
+        sessionWindow.signals.handler = None
+        builder = sessionWindow.builder
+        window = builder.get_object("windowSession")
+        if not sessionWindow.is_destroyed:
+            window.hide()
+        with self._lock:
+            isKept = len(self._idle_windows) < MAX_IDLE_SESSION_WINDOWS and not sessionWindow.is_destroyed
+            if isKept:
+                self._idle_windows.append(sessionWindow)
+            else:
+                self._statistics['destroyed'] += 1
+                self._statistics['live'] -= 1
+        if isKept:
+            self.__reset(builder)
+        elif not sessionWindow.is_destroyed:
+            window.destroy()
+
+    def record_time_to_window(self, sessionWindow):
+        # Called right after the window was shown. Measured from acquire(), so that only the part
+        # the pool can save is in it (not the handshake or the time spent waiting for admission).
+        duration = time.perf_counter() - sessionWindow.acquired_at
+        with self._lock:
+            self._statistics['time_to_window'] = duration
+        logger.info("Session-window shown after %.1f ms (%s)" % (
+            duration * 1000,
+            "reused" if sessionWindow.is_reused else "built in %.1f ms" % (sessionWindow.build_duration * 1000)
+        ))
+
+    def get_statistics(self):
+        with self._lock:
+            statistics = dict(self._statistics)
+            statistics['idle'] = len(self._idle_windows)
+        return statistics
+
+    def __build_window(self):
+        begin = time.perf_counter()
+        builder = Gtk.Builder()
+        load_ui_component(builder, "session")
+        signals = SessionWindowSignals()
+        builder.connect_signals(signals)
+        with self._lock:
+            self._statistics['created'] += 1
+            self._statistics['live'] += 1
+        sessionWindow = SessionWindow(builder, signals, time.perf_counter() - begin)
+        builder.get_object("windowSession").connect("destroy", sessionWindow.on_destroy)
+        return sessionWindow
+
+    def __reset(self, builder):
+        builder.get_object("windowSession").set_title("")
+        builder.get_object("treeviewWatches").set_model(None) # the next handler brings its own model
+        builder.get_object("liststoreStack").clear()
+        builder.get_object("textviewLog").get_buffer().set_text("")
+        builder.get_object("expanderLog").set_expanded(False)
+        builder.get_object("labelSessionStatistics").set_text("")
+        for buttonId in ["buttonStepInto", "buttonStepOver", "buttonStepOut", "buttonRun", "buttonRunToEnd"]:
+            builder.get_object(buttonId).set_sensitive(True)
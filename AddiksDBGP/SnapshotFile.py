@@ -0,0 +1,84 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import ast
+import zlib
+import threading
+
+# An append-only file of the breakpoint-hits recorded in snapshot-mode.
+#
+# Every hit is stored as one zlib-compressed repr() of a dictionary, the records are written back to
+# back. A separate index-file holds one line per record with its offset, length, time and location,
+# so that all hits can be listed without reading (let alone decompressing) any of the records.
+class SnapshotFile:
+
+    def __init__(self, filePath):
+        self._file_path = filePath
+        self._index_path = filePath + ".index"
+        self._index = None
+        self._lock = threading.Lock()
+
+    def get_file_path(self):
+        return self._file_path
+
+    def append(self, snapshot):
+        # called from the worker-threads of all sessions recording into this file
+        data = zlib.compress(repr(snapshot).encode("utf-8"))
+        with self._lock:
+            directory = os.path.dirname(self._file_path)
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+            with open(self._file_path, "ab") as dataFile:
+                offset = dataFile.seek(0, os.SEEK_END)
+                dataFile.write(data)
+            entry = (offset, len(data), snapshot['time'], snapshot['lineno'], snapshot['filename'])
+            with open(self._index_path, "a", encoding="utf-8") as indexFile:
+                indexFile.write("%d\t%d\t%f\t%d\t%s\n" % entry)
+            if self._index != None:
+                self._index.append(entry)
+
+    def get_index(self):
+        # list of (offset, length, time, line, file-path), one entry per recorded hit
+        with self._lock:
+            if self._index == None:
+                self._index = self.__read_index()
+            return list(self._index)
+
+    def read(self, index):
+        offset, length, hitTime, line, filePath = self.get_index()[index]
+        with open(self._file_path, "rb") as dataFile:
+            dataFile.seek(offset)
+            data = dataFile.read(length)
+        return ast.literal_eval(zlib.decompress(data).decode("utf-8"))
+
+    def __len__(self):
+        return len(self.get_index())
+
+    def __read_index(self):
+        index = []
+        if os.path.exists(self._index_path) and os.path.exists(self._file_path):
+            dataSize = os.path.getsize(self._file_path)
+            with open(self._index_path, "r", encoding="utf-8") as indexFile:
+                for indexLine in indexFile:
+                    fields = indexLine.rstrip("\n").split("\t", 4)
+                    if len(fields) < 5:
+                        break # interrupted while writing
+                    offset, length = int(fields[0]), int(fields[1])
+                    if offset + length > dataSize:
+                        break
+                    index.append((offset, length, float(fields[2]), int(fields[3]), fields[4]))
+        return index
@@ -0,0 +1,119 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import time
+from gi.repository import Gtk
+from AddiksDBGP.GladeHandler import GladeHandler
+from AddiksDBGP.UiResources import load_ui_component
+
+# Browses the breakpoint-hits of a snapshot-file (see the snapshot-mode of DebugSession).
+#
+# The hits are listed from the index of the file, a hit is only read when it gets selected and is
+# then shown in a session-window of its own. For the GladeHandler of that window the viewer stands
+# in for the session: it is read-only, nothing can be executed, changed or loaded later on.
+class SnapshotViewer:
+
+    def __init__(self, plugin, snapshotFile):
+        self._plugin = plugin
+        self._snapshot_file = snapshotFile
+        self._glade_builder = None
+        self._glade_handler = None
+
+    def show(self):
+        builder = self._getGladeBuilder()
+        liststoreSnapshots = builder.get_object("liststoreSnapshots")
+        liststoreSnapshots.clear()
+        for index, (offset, length, hitTime, line, filePath) in enumerate(self._snapshot_file.get_index()):
+            liststoreSnapshots.append([
+                index,
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(hitTime)),
+                filePath + ":" + str(line)
+            ])
+        window = builder.get_object("windowSnapshots")
+        window.set_title("Snapshots: " + os.path.basename(self._snapshot_file.get_file_path()))
+        window.show_all()
+
+    def show_snapshot(self, index):
+        snapshot = self._snapshot_file.read(index)
+        builder = self._getGladeBuilder()
+        self._glade_handler.updateStack(snapshot['stack'])
+        self._glade_handler.updateWatches(snapshot['rows'])
+        window = builder.get_object("windowSession")
+        window.set_title("Snapshot: %s:%d" % (snapshot['filename'], snapshot['lineno']))
+        window.show_all()
+        for widgetId in ["boxSessionButtons", "boxWatchesButtonlist", "expanderLog"]:
+            builder.get_object(widgetId).hide()
+
+    def close(self):
+        builder = self._getGladeBuilder()
+        builder.get_object("windowSession").hide()
+        builder.get_object("windowSnapshots").hide()
+
+    ### SESSION INTERFACE (READ-ONLY)
+
+    def dispatch(self, command, *arguments):
+        if command == "stop": # the session-window was closed, the list of hits stays open
+            self._getGladeBuilder().get_object("windowSession").hide()
+
+    def open_uri_resouce(self, uri, line=None):
+        if uri[0:7] == 'file://':
+            uri = uri[7:]
+        self._plugin.open_window_file(uri, line)
+
+    def is_truncated(self, fullName):
+        return False # recorded values cannot be edited anyway
+
+    def get_full_value(self, fullName, propertyType="property"):
+        return None # only what was recorded is there
+
+    def get_types(self):
+        return []
+
+    def set_property(self, fullName, typeName, newValue):
+        pass
+
+    def add_watch(self, definition):
+        pass
+
+    def remove_watch(self, definition):
+        pass
+
+    def clear_watches(self):
+        pass
+
+    def expand_watch(self, fullName):
+        pass
+
+    def expand_property(self, fullName):
+        pass
+
+    def collapse_watch(self, fullName):
+        pass
+
+    def load_property_page(self, fullName, page, propertyType="property"):
+        pass
+
+    ### GLADE
+
+    def _getGladeBuilder(self):
+        if self._glade_builder == None:
+            self._glade_builder = Gtk.Builder()
+            load_ui_component(self._glade_builder, "session")
+            load_ui_component(self._glade_builder, "snapshots")
+            self._glade_handler = GladeHandler(self._plugin, self._glade_builder, session=self)
+            self._glade_builder.connect_signals(self._glade_handler)
+        return self._glade_builder
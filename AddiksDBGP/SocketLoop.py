@@ -0,0 +1,139 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import socket
+import selectors
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# The one I/O core of the plugin.
+#
+# A single thread waits (using selectors) on every socket of the plugin and calls the registered
+# callback when a socket becomes readable. Work that has to block on the debugging engine (e.g. the
+# session handshake or a view refresh) is handed to a small, fixed pool of worker threads, so the
+# number of threads does not grow with the number of connections or user actions.
+# The GTK main loop is never blocked by this; UI updates are still marshalled with GLib.idle_add.
+class SocketLoop:
+
+    def __init__(self, workerCount=8):
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self._wakeup_writer.setblocking(False)
+        self._selector.register(self._wakeup_reader, selectors.EVENT_READ, None)
+        self._scheduled_callbacks = deque()
+        self._executor = ThreadPoolExecutor(max_workers=workerCount, thread_name_prefix="addiks-dbgp-worker")
+        self._thread = None
+        self._is_running = False
+        self._lock = threading.Lock()
+
+    def add_reader(self, fileObject, callback):
+        # The callback is called on the loop-thread with the file-object as the only argument
+        # every time the file-object becomes readable. It must not block.
+        self.call_soon(self.__register, fileObject, callback)
+
+    def remove_reader(self, fileObject):
+        self.call_soon(self.__unregister, fileObject)
+
+    def call_soon(self, callback, *arguments):
+        self.__ensure_running()
+        self._scheduled_callbacks.append((callback, arguments))
+        self.__wakeup()
+
+    def run_in_worker(self, callback, *arguments):
+        return self._executor.submit(self.__call_logged, callback, *arguments)
+
+    def is_loop_thread(self):
+        return threading.current_thread() is self._thread
+
+    def stop(self):
+        with self._lock:
+            self._is_running = False
+        self.__wakeup()
+        self._executor.shutdown(wait=False)
+
+    def __ensure_running(self):
+        with self._lock:
+            if not self._is_running:
+                self._is_running = True
+                self._thread = threading.Thread(target=self.__run, name="addiks-dbgp-io", daemon=True)
+                self._thread.start()
+
+    def __wakeup(self):
+        try:
+            self._wakeup_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass # loop is already about to wake up (or gone)
+
+    def __register(self, fileObject, callback):
+        try:
+            self._selector.register(fileObject, selectors.EVENT_READ, callback)
+        except KeyError:
+            self._selector.modify(fileObject, selectors.EVENT_READ, callback)
+        except (ValueError, OSError):
+            pass # socket was closed before it could be registered
+
+    def __unregister(self, fileObject):
+        try:
+            self._selector.unregister(fileObject)
+        except (KeyError, ValueError, OSError):
+            pass
+
+    def __run(self):
+        while self._is_running:
+            try:
+                readyKeys = self._selector.select()
+            except (ValueError, OSError):
+                self.__forget_closed_sockets()
+                continue
+
+            for key, events in readyKeys:
+                if key.data is None:
+                    self.__drain_wakeup()
+                else:
+                    self.__call_in_loop(key.data, key.fileobj)
+
+            while len(self._scheduled_callbacks) > 0:
+                callback, arguments = self._scheduled_callbacks.popleft()
+                self.__call_in_loop(callback, *arguments)
+
+    def __forget_closed_sockets(self):
+        for key in list(self._selector.get_map().values()):
+            if key.fileobj.fileno() < 0:
+                self._selector.unregister(key.fileobj)
+
+    def __drain_wakeup(self):
+        try:
+            while len(self._wakeup_reader.recv(4096)) > 0:
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def __call_in_loop(self, callback, *arguments):
+        # an exception in one callback must not take down the loop for all other sockets
+        try:
+            callback(*arguments)
+        except Exception:
+            traceback.print_exc()
+
+    def __call_logged(self, callback, *arguments):
+        try:
+            return callback(*arguments)
+        except Exception:
+            traceback.print_exc()
+            raise
@@ -0,0 +1,59 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Maps the language-specific type names of an engine (e.g. 'array' in PHP) to the common DBGp types
+# (e.g. 'hash') and xsi-types, see: http://xdebug.org/docs-dbgp.php#id38
+# Every language type is stored only once, lookups are a single dictionary access.
+class TypeMap:
+
+    def __init__(self, entries=[]):
+        self._types = {}
+        self.set_entries(entries)
+
+    def read_xml(self, typesXml):
+        for mapXml in typesXml:
+            if 'name' in mapXml.attrib and 'type' in mapXml.attrib:
+                xsiType = None
+                if 'xsi:type' in mapXml.attrib:
+                    xsiType = mapXml.attrib['xsi:type']
+                self._types[mapXml.attrib['name']] = (mapXml.attrib['type'], xsiType)
+
+    def set_entries(self, entries):
+        self._types = {}
+        for typeName, dbgpType, xsiType in entries:
+            self._types[typeName] = (dbgpType, xsiType)
+
+    def get_entries(self):
+        return [[typeName, dbgpType, xsiType] for typeName, (dbgpType, xsiType) in self._types.items()]
+
+    def get_common_type(self, typeName):
+        # unknown types are returned as they are
+        if typeName in self._types:
+            return self._types[typeName][0]
+        return typeName
+
+    def get_xsi_type(self, typeName):
+        if typeName in self._types:
+            return self._types[typeName][1]
+
+    def __contains__(self, typeName):
+        return typeName in self._types
+
+    def __iter__(self):
+        return iter(self.get_entries())
+
+    def __len__(self):
+        return len(self._types)
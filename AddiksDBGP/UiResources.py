@@ -0,0 +1,84 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import threading
+from gi.repository import Gio, GLib
+
+UI_DIRECTORY = os.path.dirname(os.path.abspath(__file__)) + "/../ui"
+UI_RESOURCE_FILE = UI_DIRECTORY + "/addiks-dbgp.gresource"
+UI_RESOURCE_PREFIX = "/net/addiks/gedit-dbgp/ui/"
+
+# Every window has its own UI-file. A component lists the objects to load from it: the window and the
+# objects it uses without containing them (models, adjustments, images of buttons, its menus).
+UI_COMPONENTS = {
+    'session': ("session.ui", [
+        'image1', 'image2', 'image3', 'image4', 'image5', 'image6', 'menuWatchesContext',
+        'imageClear', 'imageRunToEnd', 'imageSessionRun', 'imageStepInto', 'imageStepOut',
+        'imageStepOver', 'imageStop', 'imageWatchesAdd', 'imageWatchesEdit', 'imageWatchesRemove',
+        'liststoreStack', 'windowSession',
+    ]),
+    'profiles': ("profiles.ui", [
+        'adjustmentDbgpPort', 'adjustmentMaxSessions', 'adjustmentMaxQueuedSessions', 'adjustmentPort',
+        'imageAddProfile', 'imageDelete', 'imageStart', 'liststoreProfiles', 'windowProfiles',
+    ]),
+    'pathmapping': ("pathmapping.ui", [
+        'imagePathmappingAdd', 'imagePathmappingRemove', 'liststorePathmapping', 'windowPathmapping',
+    ]),
+    'breakpoints': ("breakpoints.ui", [
+        'imageBreakpointsClear', 'imageBreakpointsRemove', 'liststoreBreakpoints', 'windowBreakpoints',
+        'menuBreakpoints',
+    ]),
+    'session_counters': ("session-counters.ui", [
+        'windowSessionCounters',
+    ]),
+    'snapshots': ("snapshots.ui", [
+        'liststoreSnapshots', 'windowSnapshots',
+    ]),
+}
+
+_resource_lock = threading.Lock()
+_is_resource_available = None
+
+def load_ui_component(builder, component):
+    # Adds only the objects of one component to the builder, preferably from the compiled GResource.
+    fileName, objectIds = UI_COMPONENTS[component]
+    if is_ui_resource_available():
+        builder.add_objects_from_resource(UI_RESOURCE_PREFIX + fileName, objectIds)
+    else:
+        builder.add_objects_from_file(UI_DIRECTORY + "/" + fileName, objectIds)
+
+def is_ui_resource_available():
+    # The resource is registered once. Without a compiled resource (or with one older than any of the
+    # UI-files, which would show outdated windows) the UI-files are read directly.
+    global _is_resource_available
+    with _resource_lock:
+        if _is_resource_available == None:
+            _is_resource_available = False
+            if os.path.exists(UI_RESOURCE_FILE) and not _is_resource_outdated():
+                try:
+                    Gio.resources_register(Gio.Resource.load(UI_RESOURCE_FILE))
+                    _is_resource_available = True
+                except GLib.Error:
+                    pass
+        return _is_resource_available
+
+def _is_resource_outdated():
+    resourceTime = os.path.getmtime(UI_RESOURCE_FILE)
+    for fileName, objectIds in UI_COMPONENTS.values():
+        if os.path.getmtime(UI_DIRECTORY + "/" + fileName) > resourceTime:
+            return True
+    return False
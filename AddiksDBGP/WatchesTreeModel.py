@@ -0,0 +1,266 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from gi.repository import GObject, Gtk
+
+# Columns: definition, value, fullname, type, weight
+WATCHES_COLUMN_TYPES = [str, str, str, str, int]
+
+class WatchesTreeNode:
+    __slots__ = ('id', 'parent', 'children', 'index', 'values')
+
+    def __init__(self, nodeId, parent, values):
+        self.id       = nodeId
+        self.parent   = parent
+        self.children = None # only rows that have children get a list
+        self.index    = 0
+        self.values   = values
+
+# The tree-model of the watches in the session-window.
+#
+# Rows are plain python objects that only get converted for GTK when the view asks for them, which
+# (with the fixed-height-mode of treeviewWatches) are only the rows that are actually visible.
+# The model offers the subset of the Gtk.TreeStore API the GladeHandler needs. While the model is
+# detached from the view, 'set_silent(True)' skips all change-signals, the view reads the whole
+# state again when the model gets re-attached.
+class WatchesTreeModel(GObject.Object, Gtk.TreeModel):
+
+    def __init__(self, columnTypes=WATCHES_COLUMN_TYPES):
+        GObject.Object.__init__(self)
+        self._column_types = columnTypes
+        self._stamp = 1
+        self._node_id_counter = 1 # 0 would be an empty user_data
+        self._nodes = {}
+        self._root = WatchesTreeNode(0, None, None)
+        self._root.children = []
+        self._dirty_parents = set() # parents whose children need their index recalculated
+        self._is_silent = False
+
+    def set_silent(self, isSilent):
+        self._is_silent = isSilent
+
+    ### TREESTORE API
+
+    def append(self, parentIter=None, values=None):
+        parent = self.__get_node(parentIter)
+        if values == None:
+            values = [None] * len(self._column_types)
+        node = WatchesTreeNode(self._node_id_counter, parent, list(values))
+        self._node_id_counter += 1
+        self._nodes[node.id] = node
+        self.__add_child(parent, node)
+        treeIter = self.__create_iter(node)
+        if not self._is_silent:
+            self.row_inserted(self.do_get_path(treeIter), treeIter)
+            if parent is not self._root and len(parent.children) == 1:
+                parentIter = self.__create_iter(parent)
+                self.row_has_child_toggled(self.do_get_path(parentIter), parentIter)
+        return treeIter
+
+    def set(self, treeIter, columns, values):
+        node = self.__get_node(treeIter)
+        for column, value in zip(columns, values):
+            node.values[column] = value
+        self.__emit_changed(node)
+
+    def set_value(self, treeIter, column, value):
+        node = self.__get_node(treeIter)
+        if node.values[column] != value:
+            node.values[column] = value
+            self.__emit_changed(node)
+
+    def remove(self, treeIter):
+        # like Gtk.TreeStore.remove: the iter moves on to the next row, if there is one
+        node = self.__get_node(treeIter)
+        parent = node.parent
+        index = self.__get_index(node)
+        self.remove_all([treeIter])
+        if parent.children != None and index < len(parent.children):
+            treeIter.user_data = parent.children[index].id
+            return True
+        return False
+
+    def remove_all(self, treeIters):
+        # The rows of each parent are removed in descending order of their index, the rows in front
+        # of a removed one keep their index. The siblings are renumbered once per parent at most,
+        # instead of once per removed row. The parent is marked as dirty before the view hears of a
+        # removal, so that the view never gets an outdated index of a row behind it.
+        nodesByParent = {}
+        for treeIter in treeIters:
+            node = self.__get_node(treeIter)
+            nodesByParent.setdefault(node.parent, []).append(node)
+        for parent, nodes in nodesByParent.items():
+            if parent is not self._root and parent.id not in self._nodes:
+                continue # the rows went away together with their parent in this batch
+            self.__get_index(nodes[0])
+            nodes.sort(key=lambda node: node.index, reverse=True)
+            parentIndices = []
+            if not self._is_silent and parent is not self._root:
+                parentIndices = self.do_get_path(self.__create_iter(parent)).get_indices()
+            isRemoved = False
+            for node in nodes:
+                if node.id not in self._nodes:
+                    continue # went away together with an ancestor in this batch
+                self.__forget_node(node)
+                del parent.children[node.index]
+                isRemoved = True
+                if node.index < len(parent.children):
+                    self._dirty_parents.add(parent)
+                if not self._is_silent:
+                    self.row_deleted(Gtk.TreePath.new_from_indices(parentIndices + [node.index]))
+            if isRemoved and len(parent.children) == 0 and parent is not self._root:
+                parent.children = None
+                self._dirty_parents.discard(parent)
+                if not self._is_silent:
+                    parentIter = self.__create_iter(parent)
+                    self.row_has_child_toggled(self.do_get_path(parentIter), parentIter)
+
+    def move_to_end(self, treeIter):
+        # keeps the node (and so all iters pointing to it), e.g. for 'load more' rows
+        node = self.__get_node(treeIter)
+        parent = node.parent
+        if parent.children[-1] is not node:
+            if not self._is_silent:
+                self.row_deleted(self.do_get_path(treeIter))
+            self.__remove_child(parent, node)
+            self.__add_child(parent, node)
+            if not self._is_silent:
+                self.row_inserted(self.do_get_path(treeIter), treeIter)
+
+    def clear(self):
+        while len(self._root.children) > 0:
+            self.remove(self.__create_iter(self._root.children[-1]))
+
+    ### GTK.TREEMODEL INTERFACE
+
+    def do_get_flags(self):
+        return Gtk.TreeModelFlags.ITERS_PERSIST
+
+    def do_get_n_columns(self):
+        return len(self._column_types)
+
+    def do_get_column_type(self, column):
+        return self._column_types[column]
+
+    def do_get_iter(self, treePath):
+        node = self._root
+        for index in treePath.get_indices():
+            if node.children == None or index >= len(node.children):
+                return (False, None)
+            node = node.children[index]
+        return (True, self.__create_iter(node))
+
+    def do_get_path(self, treeIter):
+        node = self.__get_node(treeIter)
+        indices = []
+        while node is not self._root:
+            indices.append(self.__get_index(node))
+            node = node.parent
+        indices.reverse()
+        return Gtk.TreePath.new_from_indices(indices)
+
+    def do_get_value(self, treeIter, column):
+        return self.__get_node(treeIter).values[column]
+
+    def do_iter_next(self, treeIter):
+        node = self.__get_node(treeIter)
+        siblings = node.parent.children
+        index = self.__get_index(node) + 1
+        if index < len(siblings):
+            treeIter.user_data = siblings[index].id
+            return (True, treeIter)
+        return (False, None)
+
+    def do_iter_previous(self, treeIter):
+        node = self.__get_node(treeIter)
+        index = self.__get_index(node) - 1
+        if index >= 0:
+            treeIter.user_data = node.parent.children[index].id
+            return (True, treeIter)
+        return (False, None)
+
+    def do_iter_children(self, parentIter):
+        return self.do_iter_nth_child(parentIter, 0)
+
+    def do_iter_has_child(self, treeIter):
+        return self.__get_node(treeIter).children != None
+
+    def do_iter_n_children(self, treeIter):
+        children = self.__get_node(treeIter).children
+        if children == None:
+            return 0
+        return len(children)
+
+    def do_iter_nth_child(self, parentIter, index):
+        children = self.__get_node(parentIter).children
+        if children == None or index >= len(children):
+            return (False, None)
+        return (True, self.__create_iter(children[index]))
+
+    def do_iter_parent(self, childIter):
+        parent = self.__get_node(childIter).parent
+        if parent == None or parent is self._root:
+            return (False, None)
+        return (True, self.__create_iter(parent))
+
+    ### HELPERS
+
+    def __create_iter(self, node):
+        treeIter = Gtk.TreeIter()
+        treeIter.stamp = self._stamp
+        treeIter.user_data = node.id
+        return treeIter
+
+    def __get_node(self, treeIter):
+        if treeIter == None or treeIter.user_data == None:
+            return self._root
+        return self._nodes[treeIter.user_data]
+
+    def __get_index(self, node):
+        # Indices are recalculated lazily, on the first lookup after a row in front was removed.
+        # Removing rows one by one renumbers on every removal, many rows go through remove_all.
+        if node.parent in self._dirty_parents:
+            for index, sibling in enumerate(node.parent.children):
+                sibling.index = index
+            self._dirty_parents.discard(node.parent)
+        return node.index
+
+    def __add_child(self, parent, node):
+        if parent.children == None:
+            parent.children = []
+        node.index = len(parent.children)
+        parent.children.append(node)
+
+    def __remove_child(self, parent, node):
+        index = self.__get_index(node)
+        del parent.children[index]
+        if index < len(parent.children):
+            self._dirty_parents.add(parent)
+        if len(parent.children) == 0 and parent is not self._root:
+            parent.children = None
+            self._dirty_parents.discard(parent)
+
+    def __forget_node(self, node):
+        del self._nodes[node.id]
+        if node.children != None:
+            for child in node.children:
+                self.__forget_node(child)
+            self._dirty_parents.discard(node)
+
+    def __emit_changed(self, node):
+        if not self._is_silent:
+            treeIter = self.__create_iter(node)
+            self.row_changed(self.do_get_path(treeIter), treeIter)
@@ -0,0 +1,101 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Accept latency and burst rate of the PortListener, plus the time it takes to shut down.
+# Simulates XDebug connecting with start_with_request=yes at a fixed rate.
+#
+# Usage: python3 benchmarks/accept_rate.py [connections-per-second] [seconds] [ports]
+
+import os
+import sys
+import time
+import socket
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from AddiksDBGP.SocketLoop import SocketLoop
+from AddiksDBGP.PortListener import PortListener
+
+def main():
+    rate      = float(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seconds   = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    portCount = int(sys.argv[3])   if len(sys.argv) > 3 else 4
+
+    # Keyed by (server port, client port): the same ephemeral client port gets reused for the
+    # connections to different listening ports.
+    connectTimes = {}
+    acceptTimes  = {}
+    acceptCount  = [0]
+    acceptLock   = threading.Lock()
+    acceptedAll  = threading.Event()
+    total = int(rate * seconds)
+
+    def on_accept(clientSocket, address):
+        acceptedAt = time.perf_counter()
+        with acceptLock:
+            acceptTimes[(clientSocket.getsockname()[1], address[1])] = acceptedAt
+            acceptCount[0] += 1
+            if acceptCount[0] >= total:
+                acceptedAll.set()
+        clientSocket.close()
+
+    socketLoop = SocketLoop()
+    listener = PortListener(socketLoop, on_accept, host="127.0.0.1")
+    ports = [listener.listen(0) for index in range(portCount)]
+
+    clientSockets = []
+    begin = time.perf_counter()
+    for index in range(total):
+        # keep the requested rate, like php-fpm workers starting requests
+        delay = begin + index / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        clientSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        connectTime = time.perf_counter()
+        clientSocket.connect(("127.0.0.1", ports[index % portCount]))
+        connectTimes[(clientSocket.getpeername()[1], clientSocket.getsockname()[1])] = connectTime
+        clientSockets.append(clientSocket)
+
+    acceptedAll.wait(30)
+    duration = time.perf_counter() - begin
+
+    latencies = sorted(acceptTimes[key] - connectTimes[key] for key in acceptTimes if key in connectTimes)
+    def percentile(fraction):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000
+
+    print("connections: %d over %d ports, accepted: %d" % (total, portCount, acceptCount[0]))
+    print("rate:        %.1f connections/s" % (acceptCount[0] / duration))
+    print("latency:     p50 %.3f ms, p99 %.3f ms, max %.3f ms" % (percentile(0.5), percentile(0.99), latencies[-1] * 1000))
+
+    begin = time.perf_counter()
+    listener.close()
+    while True:
+        probeSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            probeSocket.connect(("127.0.0.1", ports[0]))
+        except ConnectionRefusedError:
+            break
+        finally:
+            probeSocket.close()
+    print("shutdown:    %.3f ms" % ((time.perf_counter() - begin) * 1000))
+
+    for clientSocket in clientSockets:
+        clientSocket.close()
+    socketLoop.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Throughput of the DBGp frame reader for multi-megabyte responses.
+#
+# Usage: python3 benchmarks/packet_reader.py [frame-size-in-MB] [frame-count]
+
+import os
+import sys
+import time
+import socket
+import base64
+import threading
+import xml.etree.ElementTree as ElementTree
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from AddiksDBGP.PacketReader import PacketReader
+
+def build_frame(sizeInBytes):
+    propertyXml = '<property name="$a" fullname="$a[%d]" type="string" encoding="base64"><![CDATA[%s]]></property>'
+    value = base64.b64encode(("äöü-" * 64).encode("utf-8")).decode("ascii")
+    properties = []
+    size = 0
+    while size < sizeInBytes:
+        properties.append(propertyXml % (len(properties), value))
+        size += len(properties[-1])
+    xmlData = (
+        '<?xml version="1.0" encoding="iso-8859-1"?>\n'
+        '<response xmlns="urn:debugger_protocol_v1" command="context_get" context="0" transaction_id="1">'
+        + "".join(properties) +
+        '</response>'
+    ).encode("utf-8")
+    return str(len(xmlData)).encode("ascii") + b"\0" + xmlData + b"\0"
+
+def read_legacy(clientSocket):
+    # the reader as it was before PacketReader (DebugSession.__read_xml_packet)
+    packetBegin = clientSocket.recv(128).decode("utf-8")
+    lengthString, xmlData = packetBegin.split('\0', 1)
+    pendingDataSize = int(lengthString) - len(xmlData)
+    while pendingDataSize > 0:
+        dataBlock = clientSocket.recv(pendingDataSize).decode("utf-8")
+        pendingDataSize -= len(dataBlock)
+        xmlData += dataBlock
+    clientSocket.recv(1)
+    xmlData = xmlData.replace("\\n", "\n")
+    xmlData = xmlData.replace("\\x00", "")
+    xmlData = xmlData.replace("\0", "")
+    return ElementTree.fromstring(xmlData)
+
+def measure(name, frame, frameCount, readFunction):
+    serverSocket, clientSocket = socket.socketpair()
+
+    def send():
+        for index in range(frameCount):
+            serverSocket.sendall(frame)
+
+    thread = threading.Thread(target=send)
+    begin = time.perf_counter()
+    thread.start()
+    for index in range(frameCount):
+        readFunction(clientSocket)
+    duration = time.perf_counter() - begin
+    thread.join()
+    serverSocket.close()
+    clientSocket.close()
+
+    megabytes = len(frame) * frameCount / (1024 * 1024)
+    print("%-14s %8.1f MB in %7.3f s = %8.1f MB/s" % (name, megabytes, duration, megabytes / duration))
+
+def main():
+    frameSize  = float(sys.argv[1]) if len(sys.argv) > 1 else 4
+    frameCount = int(sys.argv[2])   if len(sys.argv) > 2 else 10
+    frame = build_frame(int(frameSize * 1024 * 1024))
+
+    readers = {}
+    def read_buffered(clientSocket):
+        if clientSocket not in readers:
+            readers[clientSocket] = PacketReader(clientSocket)
+        return readers[clientSocket].read_packet()
+
+    try:
+        measure("legacy",       frame, frameCount, read_legacy)
+    except UnicodeDecodeError:
+        print("legacy         failed: multibyte character split across recv() calls")
+    measure("PacketReader", frame, frameCount, read_buffered)
+
+if __name__ == "__main__":
+    main()
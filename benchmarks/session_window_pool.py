@@ -0,0 +1,82 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Time until the session-window of a short-lived session is shown: a new Gtk.Builder from the
+# glade-file per session (as it was before) versus a window taken from the SessionWindowPool.
+# Needs PyGObject and a display.
+#
+# Usage: python3 benchmarks/session_window_pool.py [session-count]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from gi.repository import GLib, Gtk
+from AddiksDBGP.GladeHandler import GladeHandler
+from AddiksDBGP.SessionWindowPool import SessionWindowPool
+from AddiksDBGP.UiResources import load_ui_component
+
+def drain_main_loop():
+    context = GLib.MainContext.default()
+    while context.pending():
+        context.iteration(False)
+
+def legacy_session(index):
+    begin = time.perf_counter()
+    builder = Gtk.Builder()
+    load_ui_component(builder, "session")
+    builder.connect_signals(GladeHandler(None, builder))
+    window = builder.get_object("windowSession")
+    window.set_title("Running process: " + str(index))
+    window.show_all()
+    drain_main_loop()
+    duration = time.perf_counter() - begin
+    window.hide()
+    return duration
+
+def pooled_session(pool, index):
+    begin = time.perf_counter()
+    sessionWindow = pool.acquire(None)
+    window = sessionWindow.builder.get_object("windowSession")
+    window.set_title("Running process: " + str(index))
+    window.show_all()
+    drain_main_loop()
+    duration = time.perf_counter() - begin
+    pool.release(sessionWindow)
+    return duration
+
+def report(name, durations):
+    print("%-8s %8.1f ms average, %8.1f ms max time-to-window" % (
+        name,
+        sum(durations) / len(durations) * 1000,
+        max(durations) * 1000
+    ))
+
+def main():
+    sessionCount = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    report("before", [legacy_session(index) for index in range(sessionCount)])
+
+    pool = SessionWindowPool(None)
+    pool.prewarm()
+    report("after", [pooled_session(pool, index) for index in range(sessionCount)])
+    statistics = pool.get_statistics()
+    print("builders: %d built, %d live" % (statistics['created'], statistics['live']))
+
+if __name__ == "__main__":
+    main()
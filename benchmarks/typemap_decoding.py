@@ -0,0 +1,77 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Type resolution of decoded properties: the old linear, ever-growing typemap list versus TypeMap.
+#
+# Usage: python3 benchmarks/typemap_decoding.py [property-count] [typemap-refreshes]
+
+import os
+import sys
+import time
+import xml.etree.ElementTree as ElementTree
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from AddiksDBGP.TypeMap import TypeMap
+
+TYPEMAP_XML = """<response xmlns="urn:debugger_protocol_v1" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+    command="typemap_get" transaction_id="1">
+  <map name="bool" type="bool" xsi:type="xsd:boolean"/>
+  <map name="int" type="int" xsi:type="xsd:decimal"/>
+  <map name="float" type="float" xsi:type="xsd:double"/>
+  <map name="string" type="string" xsi:type="xsd:string"/>
+  <map name="null" type="null"/>
+  <map name="array" type="hash"/>
+  <map name="object" type="object"/>
+  <map name="resource" type="resource"/>
+</response>"""
+
+PROPERTY_TYPES = ["int", "string", "array", "object", "bool", "null", "float", "closure"]
+
+def main():
+    propertyCount = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    refreshCount  = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    typesXml = ElementTree.fromstring(TYPEMAP_XML)
+    propertyTypes = [PROPERTY_TYPES[index % len(PROPERTY_TYPES)] for index in range(propertyCount)]
+
+    # before: every typemap refresh (one per unknown property type) appended all entries again
+    legacyTypes = []
+    for refresh in range(refreshCount):
+        for mapXml in typesXml:
+            legacyTypes.append([mapXml.attrib['name'], mapXml.attrib['type'], None])
+
+    begin = time.perf_counter()
+    for dataType in propertyTypes:
+        for typeName, dbgpType, xsiType in legacyTypes:
+            if dataType == typeName:
+                dataType = dbgpType
+    legacyDuration = time.perf_counter() - begin
+
+    typemap = TypeMap()
+    for refresh in range(refreshCount):
+        typemap.read_xml(typesXml)
+
+    begin = time.perf_counter()
+    for dataType in propertyTypes:
+        dataType = typemap.get_common_type(dataType)
+    indexedDuration = time.perf_counter() - begin
+
+    print("properties: %d, typemap refreshes: %d" % (propertyCount, refreshCount))
+    print("list scan (%4d entries): %8.2f ms" % (len(legacyTypes), legacyDuration * 1000))
+    print("TypeMap   (%4d entries): %8.2f ms" % (len(typemap), indexedDuration * 1000))
+
+if __name__ == "__main__":
+    main()
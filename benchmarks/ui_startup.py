@@ -0,0 +1,57 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+# Builder time and widget count per UI component, compared to building all windows at once (which
+# is what every builder did while all windows were in one glade-file). Uses the compiled GResource
+# if there is an up-to-date one (see ui/addiks-dbgp.gresource.xml), the UI-files otherwise.
+# Needs PyGObject.
+#
+# Usage: python3 benchmarks/ui_startup.py [repetitions]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from gi.repository import Gtk
+from AddiksDBGP.UiResources import UI_COMPONENTS, load_ui_component, is_ui_resource_available
+
+def build(components, repetitions):
+    durations = []
+    for repetition in range(repetitions):
+        begin = time.perf_counter()
+        builder = Gtk.Builder()
+        for component in components:
+            load_ui_component(builder, component)
+        durations.append(time.perf_counter() - begin)
+    widgetCount = len([uiObject for uiObject in builder.get_objects() if isinstance(uiObject, Gtk.Widget)])
+    return min(durations), widgetCount
+
+def report(name, measurement):
+    duration, widgetCount = measurement
+    print("%-18s %8.2f ms %6d widgets" % (name, duration * 1000, widgetCount))
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print("source: %s" % ("gresource" if is_ui_resource_available() else "ui-files"))
+    for component in sorted(UI_COMPONENTS):
+        report(component, build([component], repetitions))
+    report("all (before)", build(sorted(UI_COMPONENTS), repetitions))
+
+if __name__ == "__main__":
+    main()
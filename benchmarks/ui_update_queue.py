@@ -0,0 +1,102 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Main-loop time of filling the watches of one step: one idle-callback per row operation (as it was
+# before) versus the coalesced operation queue of the GladeHandler.
+# Needs PyGObject and a display, the session-window is shown while measuring.
+#
+# Usage: python3 benchmarks/ui_update_queue.py [property-count]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + "/..")
+
+from gi.repository import GLib, Gtk, Pango
+from AddiksDBGP.GladeHandler import GladeHandler
+from AddiksDBGP.UiResources import load_ui_component
+
+def build_rows(propertyCount):
+    rows = []
+    for index in range(propertyCount):
+        fullName = "$var" + str(index)
+        rows.append(['row', fullName, fullName, str(index), None, "property"])
+    return rows
+
+def drain_main_loop():
+    # returns the busy time of the main loop, the number of iterations and the longest iteration
+    context = GLib.MainContext.default()
+    duration = 0.0
+    longest = 0.0
+    iterations = 0
+    while context.pending():
+        begin = time.perf_counter()
+        context.iteration(False)
+        elapsed = time.perf_counter() - begin
+        duration += elapsed
+        longest = max(longest, elapsed)
+        iterations += 1
+    return duration, iterations, longest
+
+def build_window():
+    builder = Gtk.Builder()
+    load_ui_component(builder, "session")
+    builder.get_object("windowSession").show_all()
+    drain_main_loop()
+    return builder
+
+def legacy_update(builder, rows):
+    treestoreWatches = Gtk.TreeStore(str, str, str, str, int)
+    builder.get_object("treeviewWatches").set_model(treestoreWatches)
+    watches = {}
+
+    def addWatchRow(fullName, title):
+        rowIter = treestoreWatches.append(None)
+        watches[fullName] = rowIter
+        treestoreWatches.set_value(rowIter, 0, title)
+        treestoreWatches.set_value(rowIter, 2, fullName)
+        treestoreWatches.set_value(rowIter, 3, "property")
+        treestoreWatches.set_value(rowIter, 4, Pango.Weight.NORMAL)
+
+    def setWatchRowValue(fullName, value):
+        treestoreWatches.set_value(watches[fullName], 1, value)
+
+    for kind, fullName, title, value, parentFullName, rowType in rows:
+        GLib.idle_add(addWatchRow, fullName, title)
+        GLib.idle_add(setWatchRowValue, fullName, value)
+
+def report(name, measurement):
+    duration, iterations, longest = measurement
+    print("%-8s %8.1f ms main-loop time, %6d iterations, longest %7.1f ms" % (
+        name, duration * 1000, iterations, longest * 1000
+    ))
+
+def main():
+    propertyCount = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rows = build_rows(propertyCount)
+
+    legacyBuilder = build_window()
+    legacy_update(legacyBuilder, rows)
+    report("before", drain_main_loop())
+
+    queuedBuilder = build_window()
+    gladeHandler = GladeHandler(None, queuedBuilder)
+    gladeHandler.updateWatches(rows)
+    report("after", drain_main_loop())
+
+if __name__ == "__main__":
+    main()
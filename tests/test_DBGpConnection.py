@@ -0,0 +1,116 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import socket
+import threading
+import unittest
+
+from AddiksDBGP.SocketLoop import SocketLoop
+from AddiksDBGP.DBGpConnection import DBGpConnection
+
+TIMEOUT = 5
+
+def build_frame(xml):
+    data = xml.encode("utf-8")
+    return str(len(data)).encode("ascii") + b"\0" + data + b"\0"
+
+class DBGpConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.socketLoop = SocketLoop(workerCount=2)
+        self.engineSocket, clientSocket = socket.socketpair()
+        self.engineSocket.settimeout(TIMEOUT)
+        self.connection = DBGpConnection(clientSocket, self.socketLoop)
+
+    def tearDown(self):
+        self.connection.close()
+        self.engineSocket.close()
+        self.socketLoop.stop()
+
+    def read_commands(self, count):
+        # what the engine received: list of (command, transaction-id)
+        data = b""
+        while data.count(b"\0") < count:
+            data += self.engineSocket.recv(4096)
+        commands = []
+        for packet in data.split(b"\0")[0:count]:
+            parts = packet.decode("utf-8").split(" ")
+            commands.append((parts[0], parts[parts.index("-i") + 1]))
+        return commands
+
+    def respond(self, command, transactionId, attributes=""):
+        self.engineSocket.sendall(build_frame(
+            '<response command="%s" transaction_id="%s" %s/>' % (command, transactionId, attributes)
+        ))
+
+    def test_init_packet(self):
+        self.engineSocket.sendall(build_frame('<init idekey="TEST" appid="42"/>'))
+        initXml = self.connection.get_init_packet(TIMEOUT)
+        self.assertEqual(initXml.attrib['idekey'], "TEST")
+
+    def test_init_packet_timeout_closes_connection(self):
+        with self.assertRaises(BrokenPipeError):
+            self.connection.get_init_packet(0.05)
+        self.assertTrue(self.connection.is_closed())
+
+    def test_batch_is_one_round_trip(self):
+        self.connection.send_commands([("stack_get", [], None), ("context_get", ["-c 0"], None)])
+        self.assertEqual(self.connection.get_round_trip_count(), 1)
+        self.assertEqual([command for command, transactionId in self.read_commands(2)], ["stack_get", "context_get"])
+
+    def test_responses_are_matched_by_transaction_id(self):
+        futures = self.connection.send_commands([("stack_get", [], None), ("eval", [], "$a")])
+        (firstCommand, firstId), (secondCommand, secondId) = self.read_commands(2)
+        self.assertNotEqual(firstId, secondId)
+        self.respond(secondCommand, secondId, 'n="second"')
+        self.respond(firstCommand, firstId, 'n="first"')
+        self.assertEqual(futures[0].result(TIMEOUT).attrib['n'], "first")
+        self.assertEqual(futures[1].result(TIMEOUT).attrib['n'], "second")
+
+    def test_unknown_transaction_id_is_ignored(self):
+        future = self.connection.send_command("stack_get")
+        (command, transactionId), = self.read_commands(1)
+        self.respond(command, "9999")
+        self.respond(command, transactionId)
+        self.assertEqual(future.result(TIMEOUT).attrib['transaction_id'], transactionId)
+
+    def test_notifications_are_delivered_separately(self):
+        notified = threading.Event()
+        self.connection.set_notify_handler(lambda root: notified.set())
+        future = self.connection.send_command("run")
+        (command, transactionId), = self.read_commands(1)
+        self.engineSocket.sendall(build_frame('<notify name="error"/>'))
+        self.respond(command, transactionId, 'status="break"')
+        self.assertEqual(future.result(TIMEOUT).attrib['status'], "break")
+        self.assertTrue(notified.wait(TIMEOUT))
+        self.assertEqual([root.attrib['name'] for root in self.connection.get_notifications()], ["error"])
+
+    def test_data_is_sent_base64_encoded(self):
+        self.connection.send_command("eval", [], "1+1")
+        data = self.engineSocket.recv(4096)
+        self.assertIn(b" -- MSsx\0", data)
+
+    def test_pending_commands_fail_when_the_engine_disconnects(self):
+        future = self.connection.send_command("run")
+        self.read_commands(1)
+        self.engineSocket.close()
+        with self.assertRaises(BrokenPipeError):
+            future.result(TIMEOUT)
+        with self.assertRaises(BrokenPipeError):
+            self.connection.send_command("stack_get")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import socket
+import unittest
+
+from AddiksDBGP.PacketReader import PacketReader
+
+def build_frame(xml):
+    data = xml.encode("utf-8")
+    return str(len(data)).encode("ascii") + b"\0" + data + b"\0"
+
+class PacketReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.serverSocket, self.clientSocket = socket.socketpair()
+        self.reader = PacketReader(self.clientSocket, initialSize=16)
+
+    def tearDown(self):
+        self.serverSocket.close()
+        self.clientSocket.close()
+
+    def test_reads_one_frame(self):
+        self.serverSocket.sendall(build_frame('<response command="run" transaction_id="1"/>'))
+        packet = self.reader.read_packet()
+        self.assertEqual(packet.tag, "response")
+        self.assertEqual(packet.attrib['transaction_id'], "1")
+        self.assertFalse(self.reader.has_buffered_data())
+
+    def test_reads_frames_sent_with_one_write(self):
+        self.serverSocket.sendall(build_frame('<a n="1"/>') + build_frame('<a n="2"/>'))
+        self.assertEqual(self.reader.read_packet().attrib['n'], "1")
+        self.assertEqual(self.reader.read_packet().attrib['n'], "2")
+
+    def test_frame_split_across_receives(self):
+        frame = build_frame('<response transaction_id="7">' + ("x" * 200) + '</response>')
+        self.serverSocket.sendall(frame[:5])
+        self.reader.receive()
+        self.assertIsNone(self.reader.next_packet())
+        self.serverSocket.sendall(frame[5:])
+        packet = self.reader.read_packet()
+        self.assertEqual(packet.attrib['transaction_id'], "7")
+        self.assertEqual(packet.text, "x" * 200)
+
+    def test_multibyte_characters_split_across_receives(self):
+        text = "äöü€" * 50
+        frame = build_frame('<property>' + text + '</property>')
+        splitPosition = frame.index("€".encode("utf-8")) + 1 # in the middle of a character
+        self.serverSocket.sendall(frame[:splitPosition])
+        self.reader.receive()
+        self.assertIsNone(self.reader.next_packet())
+        self.serverSocket.sendall(frame[splitPosition:])
+        self.assertEqual(self.reader.read_packet().text, text)
+
+    def test_length_counts_bytes_not_characters(self):
+        self.serverSocket.sendall(build_frame('<a>€</a>') + build_frame('<b/>'))
+        self.assertEqual(self.reader.read_packet().text, "€")
+        self.assertEqual(self.reader.read_packet().tag, "b")
+
+    def test_closed_connection_raises(self):
+        self.serverSocket.close()
+        with self.assertRaises(socket.error):
+            self.reader.read_packet()
+
+if __name__ == "__main__":
+    unittest.main()
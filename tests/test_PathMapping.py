@@ -0,0 +1,70 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from AddiksDBGP.PathMapping import PathMapping
+
+class PathMappingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filePath = os.path.join(self.directory, "profile", "path_mapping.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_without_file_nothing_is_mapped(self):
+        pathMapping = PathMapping(self.filePath)
+        self.assertEqual(pathMapping.get_mappings(), [])
+        self.assertEqual(pathMapping.mapRemoteToLocal("/var/www/index.php"), "/var/www/index.php")
+
+    def test_maps_in_both_directions(self):
+        pathMapping = PathMapping(self.filePath)
+        pathMapping.add_path_mapping("/home/user/project", "/var/www")
+        self.assertEqual(pathMapping.mapRemoteToLocal("/var/www/src/index.php"), "/home/user/project/src/index.php")
+        self.assertEqual(pathMapping.mapLocalToRemote("/home/user/project/src/index.php"), "/var/www/src/index.php")
+        self.assertEqual(pathMapping.mapRemoteToLocal("/usr/share/php/lib.php"), "/usr/share/php/lib.php")
+
+    def test_saved_mappings_are_loaded_again(self):
+        pathMapping = PathMapping(self.filePath)
+        pathMapping.add_path_mapping("/home/user/a", "/srv/a")
+        pathMapping.add_path_mapping("/home/user/b, with comma", "/srv/b")
+        pathMapping.add_path_mapping("/home/user/c", "/srv/c")
+        pathMapping.remove_path_mapping("/home/user/c")
+        self.assertTrue(os.path.exists(self.filePath))
+        self.assertEqual(sorted(PathMapping(self.filePath).get_mappings()), [
+            ("/home/user/a", "/srv/a"),
+            ("/home/user/b, with comma", "/srv/b"),
+        ])
+
+    def test_file_is_read_only_once(self):
+        pathMapping = PathMapping(self.filePath)
+        pathMapping.add_path_mapping("/home/user/a", "/srv/a")
+        os.remove(self.filePath)
+        self.assertEqual(pathMapping.get_mappings(), [("/home/user/a", "/srv/a")])
+
+    def test_malformed_rows_are_skipped(self):
+        os.makedirs(os.path.dirname(self.filePath))
+        with open(self.filePath, "w") as fileHandle:
+            fileHandle.write("/home/user/a,/srv/a\nbroken\n/x,/y,/z\n")
+        self.assertEqual(PathMapping(self.filePath).get_mappings(), [("/home/user/a", "/srv/a")])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from AddiksDBGP.SessionAdmission import SessionAdmission
+
+class FakeSession:
+
+    def __init__(self, initAttributes=None):
+        self.initAttributes = initAttributes or {'idekey': "TEST"}
+        self.isClosed = False
+        self.state = "new"
+
+    def get_init_attributes(self):
+        return self.initAttributes
+
+    def detach(self):
+        self.state = "detached"
+
+    def run_unattended(self):
+        self.state = "running"
+
+    def is_connection_closed(self):
+        return self.isClosed
+
+class FakePlugin:
+
+    def attach_session(self, session):
+        session.state = "attached"
+
+    def run_in_worker(self, callback, *arguments):
+        callback(*arguments)
+
+def build_profile(maxSessions=1, maxQueuedSessions=2, rules=None):
+    return {
+        'session_filter_rules': rules or [],
+        'max_sessions':         maxSessions,
+        'max_queued_sessions':  maxQueuedSessions,
+    }
+
+class SessionAdmissionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.admission = SessionAdmission(FakePlugin())
+
+    def test_filter_rules_detach_or_run(self):
+        profile = build_profile(rules=["detach idekey=CRON", "run idekey=LOADTEST"])
+        cronSession = FakeSession({'idekey': "CRON"})
+        loadSession = FakeSession({'idekey': "LOADTEST"})
+        self.admission.admit(cronSession, "default", profile)
+        self.admission.admit(loadSession, "default", profile)
+        self.assertEqual((cronSession.state, loadSession.state), ("detached", "running"))
+        statistics = self.admission.get_statistics()
+        self.assertEqual((statistics['filtered'], statistics['attached']), (2, 0))
+
+    def test_sessions_beyond_the_limit_wait_and_then_get_detached(self):
+        profile = build_profile()
+        sessions = [FakeSession() for index in range(4)]
+        for session in sessions:
+            self.admission.admit(session, "default", profile)
+        self.assertEqual([session.state for session in sessions], ["attached", "new", "new", "detached"])
+        statistics = self.admission.get_statistics()
+        self.assertEqual(
+            (statistics['accepted'], statistics['attached'], statistics['queued'], statistics['detached']),
+            (1, 1, 2, 1)
+        )
+
+    def test_release_attaches_next_waiting_session(self):
+        profile = build_profile()
+        sessions = [FakeSession() for index in range(3)]
+        for session in sessions:
+            self.admission.admit(session, "default", profile)
+        self.admission.release(sessions[0])
+        self.assertEqual([session.state for session in sessions], ["attached", "attached", "new"])
+        self.admission.release(sessions[1])
+        self.admission.release(sessions[2])
+        statistics = self.admission.get_statistics()
+        self.assertEqual((statistics['accepted'], statistics['attached'], statistics['queued']), (3, 0, 0))
+        self.assertGreaterEqual(statistics['wait_max'], statistics['wait_average'])
+
+    def test_profiles_are_limited_separately(self):
+        first = FakeSession()
+        second = FakeSession()
+        self.admission.admit(first, "a", build_profile())
+        self.admission.admit(second, "b", build_profile())
+        self.assertEqual((first.state, second.state), ("attached", "attached"))
+
+    def test_closed_waiting_sessions_are_pruned(self):
+        profile = build_profile()
+        sessions = [FakeSession() for index in range(3)]
+        for session in sessions:
+            self.admission.admit(session, "default", profile)
+        sessions[1].isClosed = True
+        statistics = self.admission.get_statistics()
+        self.assertEqual((statistics['queued'], statistics['abandoned']), (1, 1))
+
+        # the pruned place in the queue is free again
+        lateSession = FakeSession()
+        self.admission.admit(lateSession, "default", profile)
+        self.assertEqual(lateSession.state, "new")
+        self.assertEqual(self.admission.get_statistics()['queued'], 2)
+
+    def test_release_skips_closed_waiting_sessions(self):
+        profile = build_profile()
+        sessions = [FakeSession() for index in range(3)]
+        for session in sessions:
+            self.admission.admit(session, "default", profile)
+        sessions[1].isClosed = True
+        self.admission.release(sessions[0])
+        self.assertEqual([session.state for session in sessions], ["attached", "new", "attached"])
+        self.assertEqual(self.admission.get_statistics()['abandoned'], 1)
+
+if __name__ == "__main__":
+    unittest.main()
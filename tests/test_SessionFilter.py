@@ -0,0 +1,63 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from AddiksDBGP.SessionFilter import SessionFilter
+
+class SessionFilterTest(unittest.TestCase):
+
+    def test_attaches_without_rules(self):
+        self.assertEqual(SessionFilter([]).get_action({'idekey': "TEST"}), "attach")
+
+    def test_first_matching_rule_wins(self):
+        sessionFilter = SessionFilter([
+            "detach fileuri=*/cron/*",
+            "run fileuri=*/cron/* idekey=TEST",
+        ])
+        self.assertEqual(sessionFilter.get_action({'fileuri': "file:///srv/cron/job.php", 'idekey': "TEST"}), "detach")
+
+    def test_all_conditions_must_match(self):
+        sessionFilter = SessionFilter(["run idekey=LOADTEST appid=4*"])
+        self.assertEqual(sessionFilter.get_action({'idekey': "LOADTEST", 'appid': "4711"}), "run")
+        self.assertEqual(sessionFilter.get_action({'idekey': "LOADTEST", 'appid': "5711"}), "attach")
+        self.assertEqual(sessionFilter.get_action({'idekey': "OTHER", 'appid': "4711"}), "attach")
+
+    def test_missing_attribute_matches_only_wildcards(self):
+        sessionFilter = SessionFilter(["detach url=*/health*"])
+        self.assertEqual(sessionFilter.get_action({'idekey': "TEST"}), "attach")
+        self.assertEqual(SessionFilter(["detach url=*"]).get_action({}), "detach")
+
+    def test_patterns_are_case_sensitive(self):
+        sessionFilter = SessionFilter(["detach idekey=test"])
+        self.assertEqual(sessionFilter.get_action({'idekey': "TEST"}), "attach")
+
+    def test_rule_without_conditions_matches_everything(self):
+        self.assertEqual(SessionFilter(["run"]).get_action({'idekey': "TEST"}), "run")
+
+    def test_invalid_rules_are_ignored(self):
+        with self.assertLogs("AddiksDBGP.SessionFilter", level="WARNING"):
+            sessionFilter = SessionFilter([
+                "",
+                "kill idekey=TEST",
+                "detach idekey",
+                "detach host=localhost",
+                "run idekey=TEST",
+            ])
+        self.assertEqual(sessionFilter.get_action({'idekey': "TEST"}), "run")
+
+if __name__ == "__main__":
+    unittest.main()
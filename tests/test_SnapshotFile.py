@@ -0,0 +1,101 @@
+# Copyright (C) 2015 Gerrit Addiks <gerrit@addiks.net>
+# https://github.com/addiks/gedit-dbgp-plugin
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from AddiksDBGP.SnapshotFile import SnapshotFile
+
+def build_snapshot(index):
+    return {
+        'time':     1000.0 + index,
+        'filename': "/srv/www/index.php",
+        'lineno':   10 + index,
+        'idekey':   "TEST",
+        'stack':    [("/srv/www/index.php", str(10 + index), "{main}")],
+        'rows':     [['row', '$a', '$a', str(index), None, 'property']],
+    }
+
+class SnapshotFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filePath = os.path.join(self.directory, "snapshots", "TEST.snapshots")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_empty_without_files(self):
+        self.assertEqual(len(SnapshotFile(self.filePath)), 0)
+
+    def test_append_and_read(self):
+        snapshotFile = SnapshotFile(self.filePath)
+        for index in range(3):
+            snapshotFile.append(build_snapshot(index))
+        self.assertEqual(len(snapshotFile), 3)
+        self.assertEqual(snapshotFile.read(1), build_snapshot(1))
+        offset, length, hitTime, line, filePath = snapshotFile.get_index()[2]
+        self.assertEqual((hitTime, line, filePath), (1002.0, 12, "/srv/www/index.php"))
+
+    def test_index_is_read_from_disk(self):
+        snapshotFile = SnapshotFile(self.filePath)
+        snapshotFile.append(build_snapshot(0))
+        snapshotFile.append(build_snapshot(1))
+        reopenedFile = SnapshotFile(self.filePath)
+        self.assertEqual(reopenedFile.get_index(), snapshotFile.get_index())
+        self.assertEqual(reopenedFile.read(0), build_snapshot(0))
+
+    def test_loaded_index_sees_later_appends(self):
+        snapshotFile = SnapshotFile(self.filePath)
+        snapshotFile.append(build_snapshot(0))
+        self.assertEqual(len(snapshotFile), 1)
+        snapshotFile.append(build_snapshot(1))
+        self.assertEqual(len(snapshotFile), 2)
+
+    def test_interrupted_writes_are_ignored(self):
+        snapshotFile = SnapshotFile(self.filePath)
+        snapshotFile.append(build_snapshot(0))
+        snapshotFile.append(build_snapshot(1))
+        with open(self.filePath + ".index", "a", encoding="utf-8") as indexFile:
+            indexFile.write("12345\t99") # index-line cut off
+        self.assertEqual(len(SnapshotFile(self.filePath)), 2)
+
+        offset, length, hitTime, line, filePath = snapshotFile.get_index()[1]
+        with open(self.filePath, "r+b") as dataFile:
+            dataFile.truncate(offset + length - 1) # record cut off
+        self.assertEqual(len(SnapshotFile(self.filePath)), 1)
+
+    def test_concurrent_appends(self):
+        snapshotFile = SnapshotFile(self.filePath)
+        threads = [
+            threading.Thread(target=lambda index=index: snapshotFile.append(build_snapshot(index)))
+            for index in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        reopenedFile = SnapshotFile(self.filePath)
+        self.assertEqual(
+            sorted(reopenedFile.read(index)['lineno'] for index in range(len(reopenedFile))),
+            [10 + index for index in range(20)]
+        )
+
+if __name__ == "__main__":
+    unittest.main()